@@ -6,18 +6,25 @@ from datetime import datetime
 from PIL import Image
 import io
 import logging
+from bson import ObjectId
 
 from database import MongoDB
 from qdrant_utils import qdrant_manager
 from gemini_utils import gemini_manager
 from clip_utils import clip_manager
 from models import ChatResponse, ChatHistoryItem, ChatHistory
-from product_handler import ProductHandler
+from product_handler import ProductHandler, EXCLUDE_EMBEDDINGS_PROJECTION
 from enhanced_product_handler import EnhancedProductHandler
 import re
 
 logger = logging.getLogger(__name__)
 
+# Product fields read by the keyword jewelry search (scoring and response)
+SIMPLE_SEARCH_PROJECTION = {
+    "name": 1, "description": 1, "price": 1, "category": 1,
+    "image_url": 1, "image_path": 1, "in_stock": 1, "created_by": 1
+}
+
 
 class ChatbotManager:
     """Manager for chatbot operations"""
@@ -163,7 +170,7 @@ class ChatbotManager:
             # Execute text search with relevance scoring
             products = list(
                 self.products_collection
-                .find(search_query)
+                .find(search_query, projection=SIMPLE_SEARCH_PROJECTION)
                 .sort([("score", {"$meta": "textScore"})])
                 .limit(limit * 2)  # Get more to filter
             )
@@ -180,7 +187,7 @@ class ChatbotManager:
                         {"created_by": user_id}
                     ]
                 }
-                products = list(self.products_collection.find(regex_query).limit(limit * 2))
+                products = list(self.products_collection.find(regex_query, projection=SIMPLE_SEARCH_PROJECTION).limit(limit * 2))
             
             # Filter for jewelry products and calculate relevance scores
             jewelry_products = []
@@ -350,7 +357,6 @@ class ChatbotManager:
                     continue
                 
                 # Convert to ObjectId if it's a valid ObjectId string
-                from bson import ObjectId
                 try:
                     if len(product_id) == 24:  # Valid ObjectId length
                         mongo_product_id = ObjectId(product_id)
@@ -360,7 +366,10 @@ class ChatbotManager:
                     mongo_product_id = product_id
                 
                 # Fetch the full product document from MongoDB
-                mongo_product = self.products_collection.find_one({"_id": mongo_product_id})
+                mongo_product = self.products_collection.find_one(
+                    {"_id": mongo_product_id},
+                    projection=EXCLUDE_EMBEDDINGS_PROJECTION
+                )
                 
                 if mongo_product:
                     # Merge Qdrant data with MongoDB data, prioritizing MongoDB for description
@@ -436,7 +445,7 @@ class ChatbotManager:
             logger.debug("Generating query embedding...")
             try:
                 # Use CLIP for text embedding to match product embeddings
-                query_embedding = clip_manager.get_text_embedding(query)
+                query_embedding = clip_manager.get_cached_text_embedding(query)
                 if not query_embedding:
                     raise ValueError("Failed to generate query embedding")
                 logger.debug("Successfully generated query embedding")
@@ -484,7 +493,7 @@ class ChatbotManager:
             logger.debug(f"Searching for products with query: '{search_query}' (original: '{query}')")
             try:
                 # Get search embedding
-                search_embedding = clip_manager.get_text_embedding(search_query)
+                search_embedding = clip_manager.get_cached_text_embedding(search_query)
                 
                 # Enhanced category detection with comprehensive keywords
                 detected_category = category
@@ -516,7 +525,7 @@ class ChatbotManager:
                     
                     # Also try Qdrant search for enhanced semantic matching
                     try:
-                        qdrant_products = qdrant_manager.search_similar_products(
+                        qdrant_products = await qdrant_manager.asearch_similar_products(
                             query_embedding=search_embedding,
                             user_id=user_id,
                             category_filter=detected_category,
@@ -621,7 +630,7 @@ class ChatbotManager:
                     logger.info("Using CLIP similarity search")
                     
                     # First try with higher score threshold for better precision
-                    products = qdrant_manager.search_similar_products(
+                    products = await qdrant_manager.asearch_similar_products(
                         query_embedding=search_embedding,
                         user_id=user_id,
                         category_filter=detected_category,
@@ -632,7 +641,7 @@ class ChatbotManager:
                     # If no results, try with a medium threshold
                     if not products:
                         logger.info("No results with strict filter, trying with medium threshold")
-                        products = qdrant_manager.search_similar_products(
+                        products = await qdrant_manager.asearch_similar_products(
                             query_embedding=search_embedding,
                             user_id=user_id,
                             category_filter=detected_category,
@@ -644,22 +653,24 @@ class ChatbotManager:
                     if products:
                         products = self._enrich_products_with_mongodb(products)
                         
-                        # Boost scores for products that match the query category
-                        if detected_category:
-                            for product in products:
-                                product_category = product.get('category', '').lower()
-                                if product_category == detected_category.lower():
-                                    # Boost score for category match
-                                    if 'score' in product:
-                                        product['score'] = min(1.0, product['score'] * 1.3)  # 30% boost, capped at 1.0
+                        # One pass: boost products that match the query category, then apply the
+                        # minimum threshold to the boosted score
+                        detected_category_lower = detected_category.lower() if detected_category else None
+                        all_scored = True
+                        kept_products = []
+                        for product in products:
+                            if 'score' not in product:
+                                all_scored = False
+                            elif detected_category_lower and product.get('category', '').lower() == detected_category_lower:
+                                product['score'] = min(1.0, product['score'] * 1.3)  # 30% boost, capped at 1.0
+                            if product.get('score', 0) >= 0.6:
+                                kept_products.append(product)
+                        products = kept_products
                         
                         # Sort by relevance score if available
-                        if all('score' in p for p in products):
+                        if all_scored:
                             products.sort(key=lambda x: x.get('score', 0), reverse=True)
                         
-                        # Apply minimum threshold to final results
-                        products = [p for p in products if p.get('score', 0) >= 0.6]
-                        
                         # Limit to requested number of results
                         products = products[:limit]
                 
@@ -683,8 +694,8 @@ class ChatbotManager:
                     # Fallback to direct Qdrant search if product handler fails
                     try:
                         # Generate embedding for the search query (which might be different from original query)
-                        search_embedding = clip_manager.get_text_embedding(search_query)
-                        products = qdrant_manager.search_similar_products(
+                        search_embedding = clip_manager.get_cached_text_embedding(search_query)
+                        products = await qdrant_manager.asearch_similar_products(
                             query_embedding=search_embedding,
                             user_id=user_id,
                             category_filter=detected_category,
@@ -836,17 +847,14 @@ class ChatbotManager:
             logger.info("Using CLIP image similarity search")
             
             # Get query embedding using CLIP for image and text
-            text_embedding = clip_manager.get_text_embedding(query or "product")
+            text_embedding = clip_manager.get_cached_text_embedding(query or "product")
             image_embedding = clip_manager.get_image_embedding(image)
             
-            # Combine embeddings (60% text, 40% image for better accuracy)
-            query_embedding = [
-                0.6 * t + 0.4 * i
-                for t, i in zip(text_embedding, image_embedding)
-            ]
+            # Combine embeddings (60% text, 40% image for better accuracy), renormalized for cosine search
+            query_embedding = clip_manager.combine_embeddings([text_embedding, image_embedding], [0.6, 0.4])
             
             # Try with category filter if detected
-            products = qdrant_manager.search_similar_products(
+            products = await qdrant_manager.asearch_similar_products(
                 query_embedding=query_embedding,
                 user_id=user_id,
                 category_filter=detected_category,
@@ -857,7 +865,7 @@ class ChatbotManager:
             # If no results, try without category filter
             if not products and detected_category:
                 logger.info("No results with category filter, trying without category filter")
-                products = qdrant_manager.search_similar_products(
+                products = await qdrant_manager.asearch_similar_products(
                     query_embedding=query_embedding,
                     user_id=user_id,
                     limit=limit * 2,
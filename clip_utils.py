@@ -2,6 +2,7 @@
 import os
 import logging
 import hashlib
+import functools
 from typing import List, Optional, Dict, Union
 import torch
 import clip
@@ -13,6 +14,14 @@ import base64
 
 logger = logging.getLogger(__name__)
 
+# Inputs per CLIP forward pass in the batch methods; bounds tensor and activation memory
+EMBEDDING_BATCH_SIZE = 32
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """Scale a float32 vector to unit length in place (zero vectors are left as-is)"""
+    vector /= max(float(np.linalg.norm(vector)), 1e-12)
+    return vector
+
 class CLIPManager:
     """Handles CLIP model for image and text embeddings"""
     
@@ -21,6 +30,8 @@ class CLIPManager:
         self.model = None
         self.preprocess = None
         self._load_model()
+        # Bounded LRU of text embeddings for repeated queries; failures are not cached
+        self._text_embedding_cache = functools.lru_cache(maxsize=4096)(self._encode_text)
     
     def _load_model(self):
         """Load CLIP model"""
@@ -32,57 +43,133 @@ class CLIPManager:
             logger.error(f"Failed to load CLIP model: {e}")
             raise
     
+    def _encode_text(self, text: str) -> tuple:
+        """Run the CLIP text encoder and return the normalized embedding as a tuple"""
+        with torch.no_grad():
+            text_tokens = openai_clip.tokenize([text]).to(self.device)
+            text_features = self.model.encode_text(text_tokens)
+            
+            # Normalize the embedding
+            text_features = _normalize(text_features[0].cpu().numpy().astype(np.float32))
+            
+            return tuple(text_features.tolist())
+    
     def get_text_embedding(self, text: str) -> List[float]:
         """Get text embedding using CLIP"""
         try:
-            with torch.no_grad():
-                text_tokens = openai_clip.tokenize([text]).to(self.device)
-                text_features = self.model.encode_text(text_tokens)
-                text_features = text_features.cpu().numpy().tolist()[0]
-                
-                # Normalize the embedding
-                text_features = np.array(text_features)
-                text_features = text_features / np.linalg.norm(text_features)
-                
-                return text_features.tolist()
+            return list(self._encode_text(text))
         except Exception as e:
             logger.error(f"Error getting text embedding: {e}")
             return [0.0] * 512  # CLIP ViT-B/32 default dimension
     
+    def get_cached_text_embedding(self, text: str) -> List[float]:
+        """Get text embedding, reusing the cached result for repeated queries"""
+        # CLIP's tokenizer lowercases and collapses whitespace itself, so this key is lossless
+        key = " ".join(text.split()).lower()
+        try:
+            return list(self._text_embedding_cache(key))
+        except Exception as e:
+            logger.error(f"Error getting text embedding: {e}")
+            return [0.0] * 512  # CLIP ViT-B/32 default dimension
+    
+    def get_text_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Get text embeddings for many texts, EMBEDDING_BATCH_SIZE per CLIP forward pass"""
+        embeddings = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            chunk = texts[start:start + EMBEDDING_BATCH_SIZE]
+            try:
+                with torch.inference_mode():
+                    # Truncate long product texts to CLIP's 77-token context instead of failing the batch
+                    text_tokens = openai_clip.tokenize(chunk, truncate=True).to(self.device)
+                    text_features = self.model.encode_text(text_tokens).float().cpu().numpy()
+                
+                # Normalize each embedding
+                text_features /= np.maximum(np.linalg.norm(text_features, axis=1, keepdims=True), 1e-12)
+                embeddings.extend(text_features.tolist())
+            except Exception as e:
+                logger.error(f"Error getting batch text embeddings: {e}")
+                embeddings.extend([0.0] * 512 for _ in chunk)  # CLIP ViT-B/32 default dimension
+        return embeddings
+    
+    def _load_image(self, image_data: Union[str, bytes, Image.Image]) -> Image.Image:
+        """Decode base64 strings, raw bytes or PIL images into a PIL image"""
+        if isinstance(image_data, str):
+            # Base64 encoded image
+            if image_data.startswith('data:image'):
+                # Remove data URL prefix
+                image_data = image_data.split(',')[1]
+            image_bytes = base64.b64decode(image_data)
+            return Image.open(BytesIO(image_bytes))
+        elif isinstance(image_data, bytes):
+            return Image.open(BytesIO(image_data))
+        elif isinstance(image_data, Image.Image):
+            return image_data
+        else:
+            raise ValueError("Unsupported image data type")
+    
+    def get_image_embeddings_batch(self, images: List[Optional[Union[str, bytes, Image.Image]]]) -> List[Optional[List[float]]]:
+        """
+        Get image embeddings for many images, EMBEDDING_BATCH_SIZE per CLIP forward pass
+        
+        Args:
+            images: Image inputs (base64 string, bytes or PIL image); None entries are skipped
+            
+        Returns:
+            One embedding per input, in order, or None where the image could not be loaded
+        """
+        embeddings = [None] * len(images)
+        pending = [index for index, image_data in enumerate(images) if image_data is not None]
+        for start in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+            # Decode and preprocess one chunk at a time, so only its tensors are held at once
+            image_inputs = []
+            positions = []
+            for index in pending[start:start + EMBEDDING_BATCH_SIZE]:
+                try:
+                    image_inputs.append(self.preprocess(self._load_image(images[index])))
+                    positions.append(index)
+                except Exception as e:
+                    logger.warning(f"Failed to load image for embedding: {e}")
+            
+            if not image_inputs:
+                continue
+            
+            try:
+                with torch.inference_mode():
+                    image_features = self.model.encode_image(torch.stack(image_inputs).to(self.device)).float().cpu().numpy()
+                
+                # Normalize each embedding
+                image_features /= np.maximum(np.linalg.norm(image_features, axis=1, keepdims=True), 1e-12)
+                for index, embedding in zip(positions, image_features.tolist()):
+                    embeddings[index] = embedding
+            except Exception as e:
+                logger.error(f"Error getting batch image embeddings: {e}")
+        
+        return embeddings
+    
     def get_image_embedding(self, image_data: Union[str, bytes, Image.Image]) -> List[float]:
         """Get image embedding using CLIP"""
         try:
-            # Handle different image input types
-            if isinstance(image_data, str):
-                # Base64 encoded image
-                if image_data.startswith('data:image'):
-                    # Remove data URL prefix
-                    image_data = image_data.split(',')[1]
-                image_bytes = base64.b64decode(image_data)
-                image = Image.open(BytesIO(image_bytes))
-            elif isinstance(image_data, bytes):
-                image = Image.open(BytesIO(image_data))
-            elif isinstance(image_data, Image.Image):
-                image = image_data
-            else:
-                raise ValueError("Unsupported image data type")
+            image = self._load_image(image_data)
             
             # Preprocess image
             image_input = self.preprocess(image).unsqueeze(0).to(self.device)
             
             with torch.no_grad():
                 image_features = self.model.encode_image(image_input)
-                image_features = image_features.cpu().numpy().tolist()[0]
                 
                 # Normalize the embedding
-                image_features = np.array(image_features)
-                image_features = image_features / np.linalg.norm(image_features)
+                image_features = _normalize(image_features[0].cpu().numpy().astype(np.float32))
                 
                 return image_features.tolist()
         except Exception as e:
             logger.error(f"Error getting image embedding: {e}")
             return [0.0] * 512  # CLIP ViT-B/32 default dimension
     
+    def combine_embeddings(self, embeddings: List[List[float]], weights: List[float]) -> List[float]:
+        """Weighted sum of embeddings, renormalized to unit length for cosine search"""
+        combined = np.asarray(weights, dtype=np.float32) @ np.asarray(embeddings, dtype=np.float32)
+        return _normalize(combined).tolist()
+    
     def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Compute cosine similarity between two embeddings"""
         try:
@@ -13,6 +13,16 @@ MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME")
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME")
+# Vector quantization for new collections: "int8" (default), "binary" or "none"
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "int8").lower()
+# Also apply QDRANT_QUANTIZATION to an existing unquantized collection at startup (opt-in)
+QDRANT_QUANTIZE_EXISTING = os.getenv("QDRANT_QUANTIZE_EXISTING", "false").lower() == "true"
+# gRPC transport (much lower per-call overhead than REST); set QDRANT_PREFER_GRPC=false to use HTTP
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+# Max pooled REST (httpx) connections per Qdrant client. Searches go over gRPC when
+# QDRANT_PREFER_GRPC is on, so this only sizes REST traffic (admin calls, or all calls with gRPC off)
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "100"))
 
 # Google Gemini API
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -4,6 +4,7 @@ import ssl
 from typing import Optional
 import logging
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, ConfigurationError
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
@@ -20,6 +21,9 @@ class MongoDB:
     
     _client = None
     _db = None
+    _async_client = None
+    _async_db = None
+    _connection_settings = None  # (url, options, db_name) of the successful connection
     
     @classmethod
     def connect(cls):
@@ -53,6 +57,7 @@ class MongoDB:
                 logger.info("Testing cloud MongoDB connection...")
                 cls._client.admin.command('ping')
                 cls._db = cls._client[MONGODB_DB_NAME]
+                cls._connection_settings = (MONGODB_URL, connection_options, MONGODB_DB_NAME)
                 logger.info("✅ Connected to cloud MongoDB successfully")
                 
             except (ConnectionFailure, ServerSelectionTimeoutError, ConfigurationError) as cloud_error:
@@ -77,6 +82,7 @@ class MongoDB:
                     cls._client = MongoClient(MONGODB_URL, **fallback_options)
                     cls._client.admin.command('ping')
                     cls._db = cls._client[MONGODB_DB_NAME]
+                    cls._connection_settings = (MONGODB_URL, fallback_options, MONGODB_DB_NAME)
                     logger.info("✅ Connected to cloud MongoDB with fallback SSL settings")
                     
                 except Exception as final_error:
@@ -88,6 +94,7 @@ class MongoDB:
                         cls._client = MongoClient(MONGODB_URL_LOCAL, serverSelectionTimeoutMS=5000)
                         cls._client.admin.command('ping')
                         cls._db = cls._client[MONGODB_DB_NAME_LOCAL]
+                        cls._connection_settings = (MONGODB_URL_LOCAL, {'serverSelectionTimeoutMS': 5000}, MONGODB_DB_NAME_LOCAL)
                         logger.info("✅ Connected to local MongoDB successfully")
                     except Exception as local_error:
                         logger.error(f"❌ Local MongoDB connection also failed: {local_error}")
@@ -102,6 +109,19 @@ class MongoDB:
             cls.connect()
         return cls._db
     
+    @classmethod
+    def get_async_db(cls):
+        """Get async (Motor) database instance using the same settings as the sync connection"""
+        if cls._async_db is None:
+            if cls._connection_settings is None:
+                cls.connect()
+            if cls._connection_settings is None:
+                return None
+            url, options, db_name = cls._connection_settings
+            cls._async_client = AsyncIOMotorClient(url, **options)
+            cls._async_db = cls._async_client[db_name]
+        return cls._async_db
+    
     @classmethod
     def get_collection(cls, collection_name: str):
         """Get a specific collection from the database"""
@@ -116,6 +136,10 @@ class MongoDB:
             cls._client = None
             cls._db = None
             logger.info("MongoDB connection closed")
+        if cls._async_client:
+            cls._async_client.close()
+            cls._async_client = None
+            cls._async_db = None
 
 class QdrantManager:
     """Qdrant vector database manager"""
@@ -1,23 +1,28 @@
 # main.py - DIAGNOSTIC VERSION to find the root cause
 
 import os
+import heapq
+import asyncio
 from dotenv import load_dotenv
 
 # Load environment variables first
 load_dotenv(override=True)
 print("Environment variables loaded:", bool(os.getenv("GOOGLE_API_KEY")))
 
-import json 
+import orjson
 import uuid
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException, Depends, status, UploadFile, File, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime, timedelta
 import logging
 import uvicorn
+from bson import ObjectId
 from database import MongoDB
 from product_handler import ProductHandler
 from qdrant_utils import QdrantManager
@@ -91,6 +96,45 @@ class ChatQuery(BaseModel):
     limit: int = 10
 
 
+def filter_results_by_owner(results: List[Dict[str, Any]], user_id: str) -> List[Dict[str, Any]]:
+    """Keep only results whose MongoDB product belongs to user_id, verified with a single query"""
+    keyed_results = []
+    for r in results:
+        product_id = r.get("id") or r.get("_id")
+        if not product_id:
+            continue
+        # Try to convert to ObjectId if it's a string
+        if isinstance(product_id, str) and ObjectId.is_valid(product_id):
+            keyed_results.append((r, ObjectId(product_id)))
+        else:
+            keyed_results.append((r, product_id))
+    
+    try:
+        products_collection = MongoDB.get_db()["products"]
+        owners = {
+            doc["_id"]: doc.get("created_by") or doc.get("user_id")
+            for doc in products_collection.find(
+                {"_id": {"$in": [product_key for _, product_key in keyed_results]}},
+                projection={"created_by": 1, "user_id": 1}
+            )
+        }
+    except Exception as e:
+        logger.error(f"Error checking product ownership: {e}")
+        # If we can't verify, exclude everything for safety
+        return []
+    
+    filtered_results = []
+    for r, product_key in keyed_results:
+        if product_key not in owners:
+            continue
+        product_user_id = owners[product_key]
+        if str(product_user_id) == str(user_id):
+            filtered_results.append(r)
+        else:
+            logger.warning(f"Product {product_key} belongs to user {product_user_id}, not {user_id}")
+    return filtered_results
+
+
 # Initialize FastAPI app with lifespan management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -101,6 +145,10 @@ async def lifespan(app: FastAPI):
         # Startup: Initialize database connections
         logger.info("Starting up application...")
         
+        # Blocking work (CLIP encoding, sync Qdrant/MongoDB calls) runs via asyncio.to_thread;
+        # size the pool for concurrent requests instead of the min(32, cpus + 4) default
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=64))
+        
         # Initialize MongoDB connection
         try:
             MongoDB.connect()
@@ -148,7 +196,6 @@ app.add_middleware(
 @app.middleware("http")
 async def add_cors_headers(request: Request, call_next):
     if request.method == "OPTIONS":
-        from fastapi.responses import JSONResponse
         response = JSONResponse(status_code=200, content={"message": "CORS preflight successful"})
     else:
         response = await call_next(request)
@@ -297,7 +344,8 @@ async def upload_products(
         
         contents = await file.read()
         try:
-            products = json.loads(contents)
+            # orjson parses the raw upload bytes directly; its decode error is a ValueError
+            products = orjson.loads(contents)
             
             if isinstance(products, dict) and "products" in products:
                 logger.warning("Received wrapped product format, extracting array")
@@ -464,19 +512,15 @@ async def chat_query(
         # Fallback: if keyword filtering removed everything, keep top semantic results
         if not filtered_results and results:
             logger.info("No keyword matches; falling back to top semantic results")
-            filtered_results = sorted(
-                results,
-                key=lambda x: x.get("similarity_score", 0),
-                reverse=True
-            )[:chat_data.limit]
+            filtered_results = results
         logger.info("=" * 80)
 
-        # Sort by similarity score
-        filtered_results = sorted(
+        # Top results by similarity score (a single selection also covers the fallback)
+        filtered_results = heapq.nlargest(
+            chat_data.limit,
             filtered_results,
-            key=lambda x: x.get("similarity_score", 0),
-            reverse=True
-        )[:chat_data.limit]
+            key=lambda x: x.get("similarity_score", 0)
+        )
 
         # Generate response
         if filtered_results:
@@ -586,36 +630,7 @@ async def public_query(
         # STRICT: Filter to only show products from the current user's database
         # Double-check user ownership by checking MongoDB
         if results:
-            from bson import ObjectId
-            db = MongoDB.get_db()
-            products_collection = db["products"]
-            filtered_results = []
-            for r in results:
-                product_id = r.get("id") or r.get("_id")
-                if product_id:
-                    try:
-                        # Try to convert to ObjectId if it's a string
-                        if isinstance(product_id, str):
-                            try:
-                                product_oid = ObjectId(product_id)
-                            except:
-                                product_oid = product_id
-                        else:
-                            product_oid = product_id
-                        
-                        # Check if product belongs to current user
-                        product_doc = products_collection.find_one({"_id": product_oid})
-                        if product_doc:
-                            product_user_id = product_doc.get("created_by") or product_doc.get("user_id")
-                            if str(product_user_id) == str(user_id):
-                                filtered_results.append(r)
-                            else:
-                                logger.warning(f"Product {product_id} belongs to user {product_user_id}, not {user_id}")
-                    except Exception as e:
-                        logger.error(f"Error checking product ownership: {e}")
-                        # If we can't verify, exclude it for safety
-                        continue
-            results = filtered_results
+            results = filter_results_by_owner(results, user_id)
             logger.info(f"After user filtering: {len(results)} products for user {user_id}")
 
         # Post-filter for gift intents: prioritize jewellery items
@@ -690,12 +705,12 @@ async def public_query(
             if filtered_tmp:
                 results = filtered_tmp
 
-        # Sort by similarity and cap to limit
-        results = sorted(
+        # Take the top results by similarity, capped to limit
+        results = heapq.nlargest(
+            max(1, min(50, data.limit)),
             results,
-            key=lambda x: x.get("similarity_score", 0),
-            reverse=True
-        )[:max(1, min(50, data.limit))]
+            key=lambda x: x.get("similarity_score", 0)
+        )
 
         # If the user explicitly asked for price of a product, craft a clear price reply
         clear_price_msg = None
@@ -779,36 +794,7 @@ async def image_search(
         # STRICT: Filter to only show products from the current user's database
         # Double-check user ownership by checking MongoDB
         if results:
-            from bson import ObjectId
-            db = MongoDB.get_db()
-            products_collection = db["products"]
-            filtered_results = []
-            for r in results:
-                product_id = r.get("id") or r.get("_id")
-                if product_id:
-                    try:
-                        # Try to convert to ObjectId if it's a string
-                        if isinstance(product_id, str):
-                            try:
-                                product_oid = ObjectId(product_id)
-                            except:
-                                product_oid = product_id
-                        else:
-                            product_oid = product_id
-                        
-                        # Check if product belongs to current user
-                        product_doc = products_collection.find_one({"_id": product_oid})
-                        if product_doc:
-                            product_user_id = product_doc.get("created_by") or product_doc.get("user_id")
-                            if str(product_user_id) == str(user_id):
-                                filtered_results.append(r)
-                            else:
-                                logger.warning(f"Product {product_id} belongs to user {product_user_id}, not {user_id}")
-                    except Exception as e:
-                        logger.error(f"Error checking product ownership: {e}")
-                        # If we can't verify, exclude it for safety
-                        continue
-            results = filtered_results
+            results = filter_results_by_owner(results, user_id)
             logger.info(f"After user filtering: {len(results)} products for user {user_id}")
         
         response = ChatResponse(
@@ -895,7 +881,8 @@ async def product_similarity_search(
             user_id=current_user.get("user_id", current_user.get("username"))
         )
         
-        return results
+        # Serialize with orjson directly; skips jsonable_encoder's per-field walk over every result
+        return ORJSONResponse(results)
         
     except Exception as e:
         logger.error(f"Product search error: {str(e)}", exc_info=True)
@@ -1,17 +1,154 @@
 from datetime import datetime
+import asyncio
+import heapq
 import logging
-from typing import List, Dict, Any
-from bson import ObjectId
-import requests
+import operator
+import re
+from typing import List, Dict, Any, Optional
+import numpy as np
+import httpx
+from bson import Binary, ObjectId
+from pymongo.errors import BulkWriteError
 from database import MongoDB
 from qdrant_utils import qdrant_manager
 from clip_utils import clip_manager
 
 logger = logging.getLogger(__name__)
 
+# 24-character hex string, the textual form of a MongoDB ObjectId
+_OBJECTID_RE = re.compile(r"^[0-9a-fA-F]{24}$")
+
+# Only the product fields search_products reads for ranking and its response
+SEARCH_RESULT_PROJECTION = {"name": 1, "description": 1, "price": 1, "category": 1, "image_url": 1, "in_stock": 1}
+
+# Product fields returned by search_jewelry_by_image_and_category; skips embeddings and image blobs
+IMAGE_SEARCH_PROJECTION = {"name": 1, "category": 1, "price": 1, "description": 1, "image_url": 1, "created_at": 1}
+
+# Embedding arrays live on product documents but are never needed in search responses
+EXCLUDE_EMBEDDINGS_PROJECTION = {"text_embedding": 0, "image_embedding": 0}
+
+# Jewelry categories recognized in free-text queries; alternation order keeps "earrings" ahead of "rings"
+_JEWELRY_CATEGORY_RE = re.compile(r"earrings|bracelets|necklaces|rings|bangles|watches")
+
+# Terms that mark a query as jewelry-related before any category scoring
+_JEWELRY_QUERY_TERMS = frozenset([
+    'jewelry', 'jewellery', 'necklace', 'ring', 'earring', 'bracelet',
+    'pendant', 'chain', 'bangle', 'anklet', 'brooch', 'gemstone',
+    'diamond', 'gold', 'silver', 'platinum', 'pearl', 'crystal'
+])
+
+# Jewelry product types routed to the specialized search_jewelry path
+_JEWELRY_PRODUCT_TYPES = frozenset(['earring', 'ring', 'necklace', 'bracelet', 'watch'])
+
+# Response fields for search_jewelry hits with their defaults; MongoDB is the source of truth
+# and the upload-time Qdrant payload only fills in fields the document lacks
+JEWELRY_RESULT_FIELDS = (
+    ("name", "Unnamed Product"),
+    ("description", ""),
+    ("price", 0.0),
+)
+
+# Detected categories whose Qdrant payload value is spelled differently; case doesn't matter,
+# since filters match the lowercased category_norm field
+QDRANT_CATEGORY_ALIASES = {"clothing": "Clothes", "jewelry": "Jewellery"}
+
+# Product types detected from search_products queries and the category each implies
+PRODUCT_TYPES = {
+    # Jewelry
+    'earring': {
+        'keywords': ['earring', 'earrings', 'stud', 'studs', 'hoop', 'hoops', 'dangle'],
+        'category': 'jewelry'
+    },
+    'ring': {
+        'keywords': ['ring', 'rings', 'band', 'bands', 'wedding ring', 'engagement ring'],
+        'category': 'jewelry'
+    },
+    'necklace': {
+        'keywords': ['necklace', 'necklaces', 'pendant', 'pendants', 'chain', 'chains', 'choker'],
+        'category': 'jewelry'
+    },
+    'bracelet': {
+        'keywords': ['bracelet', 'bracelets', 'bangle', 'bangles', 'cuff', 'cuffs'],
+        'category': 'jewelry'
+    },
+    'watch': {
+        'keywords': ['watch', 'watches', 'timepiece', 'wristwatch'],
+        'category': 'jewelry'
+    },
+    # Electronics
+    'smartphone': {
+        'keywords': ['smartphone', 'phone', 'mobile', 'iphone', 'android', 'cellphone'],
+        'category': 'electronics'
+    },
+    'laptop': {
+        'keywords': ['laptop', 'notebook', 'macbook', 'ultrabook', 'chromebook'],
+        'category': 'electronics'
+    },
+    'headphones': {
+        'keywords': ['headphones', 'earbuds', 'earphones', 'airpods', 'headset', 'earpods'],
+        'category': 'electronics'
+    },
+    'tablet': {
+        'keywords': ['tablet', 'ipad', 'android tablet', 'e-reader', 'kindle'],
+        'category': 'electronics'
+    },
+    'camera': {
+        'keywords': ['camera', 'dslr', 'mirrorless', 'point and shoot', 'action camera'],
+        'category': 'electronics'
+    },
+    'tv': {
+        'keywords': ['tv', 'television', 'smart tv', '4k tv', 'led tv', 'oled tv'],
+        'category': 'electronics'
+    },
+    # Add more categories and product types as needed
+}
+
+# One precompiled keyword alternation per product type, kept in PRODUCT_TYPES priority order
+_PRODUCT_TYPE_PATTERNS = [
+    (p_type, re.compile("|".join(map(re.escape, p_data['keywords']))), p_data['category'])
+    for p_type, p_data in PRODUCT_TYPES.items()
+]
+
+# Result batches at least this large are scored in a worker thread instead of on the event loop
+OFFLOAD_SCORING_MIN_RESULTS = 256
+
+# Max keyword (MongoDB $text) candidates handed to the dense search as a prefilter
+KEYWORD_CANDIDATE_LIMIT = 200
+
+def _float16_binary(embedding: Optional[List[float]]) -> Optional[Binary]:
+    """Pack an embedding as raw float16 bytes for MongoDB; decode with np.frombuffer(data, dtype=np.float16)"""
+    if embedding is None:
+        return None
+    return Binary(np.asarray(embedding, dtype=np.float16).tobytes())
+
+def _parse_price(value: Any) -> Optional[float]:
+    """Price as a float, or None if the stored value isn't numeric"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _relevance_kernel(similarity: np.ndarray, features: np.ndarray) -> np.ndarray:
+    """
+    Vectorized relevance scores (0-100) for a batch of products
+    
+    Args:
+        similarity: Vector similarity scores, shape (N,)
+        features: Rows from ProductHandler._relevance_features, shape (N, 6)
+    """
+    relevance = similarity * 100  # Base score from vector similarity
+    relevance += features[:, 0] * 20  # Name keyword match ratio
+    relevance += features[:, 1] * 10  # Description keyword match ratio
+    relevance += features[:, 2] * 15  # Category match
+    relevance += features[:, 3]       # Exact phrase bonus
+    relevance += features[:, 4] * 5   # Reasonable price
+    relevance += features[:, 5] * 3   # In stock
+    return np.clip(relevance, 0, 100)
+
 class ProductHandler:
     def __init__(self):
         self.db = MongoDB.get_db()
+        self.async_db = MongoDB.get_async_db()  # Motor handle for non-blocking queries in async paths
         self.logger = logging.getLogger(__name__)
         
         # Enhanced category keywords for better detection
@@ -32,61 +169,160 @@ class ProductHandler:
                 "materials": ["gold", "silver", "diamond", "pearl", "platinum", "rose gold", "white gold", "yellow gold", "sterling"]
             }
         }
+        
+        # Keyword -> [(category, weight)] index, so detection is one dict lookup per query n-gram
+        # (primary keywords weigh 3, types 2, attributes/brands/materials 1)
+        tier_weights = {"primary": 3, "types": 2, "attributes": 1, "brands": 1, "materials": 1}
+        self._category_keyword_index = {}
+        for category, keywords in self.category_keywords.items():
+            for tier, tier_keywords in keywords.items():
+                for keyword in tier_keywords:
+                    self._category_keyword_index.setdefault(keyword, []).append((category, tier_weights[tier]))
+        self._max_keyword_words = max(len(keyword.split(' ')) for keyword in self._category_keyword_index)
+        
+        self._ensure_text_index()
+    
+    def _ensure_text_index(self):
+        """Create the text index backing the keyword prefilter (no-op if it exists)"""
+        if self.db is None:
+            return
+        try:
+            self.db.products.create_index(
+                [("name", "text"), ("description", "text"), ("category", "text")],
+                name="product_text_index"
+            )
+        except Exception as e:
+            logger.warning(f"Could not create product text index: {str(e)}")
+    
+    async def _keyword_candidates(self, query: str, user_id: str = None) -> List[str]:
+        """Get IDs of the best keyword matches for a query using the MongoDB text index"""
+        try:
+            mongo_filter = {"$text": {"$search": query}}
+            if user_id:
+                mongo_filter["created_by"] = user_id
+            cursor = self.async_db.products.find(
+                mongo_filter,
+                projection={"_id": 1, "text_score": {"$meta": "textScore"}},
+                sort=[("text_score", {"$meta": "textScore"})],
+                limit=KEYWORD_CANDIDATE_LIMIT
+            )
+            return [str(doc["_id"]) async for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Keyword prefilter unavailable, using dense search only: {str(e)}")
+            return []
+    
+    async def _download_images(self, urls: List[str]) -> Dict[str, bytes]:
+        """Download image URLs concurrently; failed downloads are logged and left out"""
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+        
+        async def fetch(client: httpx.AsyncClient, url: str) -> bytes:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.content
+        
+        async with httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=32),
+            follow_redirects=True
+        ) as client:
+            responses = await asyncio.gather(
+                *(fetch(client, url) for url in unique_urls),
+                return_exceptions=True
+            )
+        
+        images = {}
+        for url, result in zip(unique_urls, responses):
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to download image {url}: {result}")
+            else:
+                images[url] = result
+        return images
     
     async def process_product_upload(self, products: List[Dict[str, Any]], user_id: str) -> Dict[str, Any]:
         """Process and store uploaded products"""
         try:
-            products_to_insert = []
             current_time = datetime.utcnow()
             
+            # Download image URLs concurrently before the embedding pass
+            image_urls = [
+                product["image"] for product in products
+                if isinstance(product.get("image"), str) and product["image"].startswith('http')
+            ]
+            downloaded_images = await self._download_images(image_urls)
+            
+            # Gather per-field columns first so CLIP can embed each modality in one batch
+            names = [product.get("name", "") for product in products]
+            descriptions = [product.get("description", "") for product in products]
+            categories = [product.get("category", "") for product in products]
+            image_inputs = []
             for product in products:
-                # Extract fields
-                name = product.get("name", "")
-                description = product.get("description", "")
-                price = product.get("price", 0.0)
-                category = product.get("category", "")
                 image_data = product.get("image", "")  # Base64 encoded image
                 
-                # Generate text embedding using CLIP for consistency
-                text_content = f"{name} {description} {category}"
-                text_embedding = clip_manager.get_text_embedding(text_content)
-                
-                # Generate image embedding using CLIP if image provided
-                image_embedding = None
-                if image_data:
-                    try:
-                        # Handle image URLs from JSON files
-                        if image_data.startswith('http'):
-                            # Download image from URL
-                            import requests
-                            response = requests.get(image_data, timeout=10)
-                            response.raise_for_status()
-                            image_bytes = response.content
-                            image_embedding = clip_manager.get_image_embedding(image_bytes)
-                        else:
-                            # Handle base64 or other formats
-                            image_embedding = clip_manager.get_image_embedding(image_data)
-                    except Exception as img_error:
-                        logger.warning(f"Failed to generate image embedding: {img_error}")
-                
-                product_doc = {
+                # Image embedding input if image provided
+                image_input = None
+                if not isinstance(image_data, str):
+                    if image_data:
+                        logger.warning(f"Skipping non-string image value of type {type(image_data).__name__}")
+                elif image_data:
+                    if image_data.startswith('http'):
+                        # Image URLs from JSON files were downloaded above
+                        image_input = downloaded_images.get(image_data)
+                    else:
+                        # Handle base64 or other formats
+                        image_input = image_data
+                image_inputs.append(image_input)
+            
+            # Text embedding input, using CLIP for consistency
+            texts = [f"{name} {description} {category}" for name, description, category in zip(names, descriptions, categories)]
+            # CLIP runs in worker threads so the event loop keeps serving other requests
+            text_embeddings, image_embeddings = await asyncio.gather(
+                asyncio.to_thread(clip_manager.get_text_embeddings_batch, texts),
+                asyncio.to_thread(clip_manager.get_image_embeddings_batch, image_inputs)
+            )
+            product_ids = [ObjectId() for _ in products]  # Assigned client-side so IDs are known before the insert
+            
+            products_to_insert = [
+                {
                     **product,
-                    "text_embedding": text_embedding,
-                    "image_embedding": image_embedding,
+                    "_id": product_id,  # After the upload fields, so an incoming _id can't replace it
+                    # Half-precision bytes are ~4x smaller than a BSON array of doubles
+                    "text_embedding": _float16_binary(text_embedding),
+                    "image_embedding": _float16_binary(image_embedding),
                     "created_at": current_time,
                     "updated_at": current_time,
                     "created_by": user_id,
                     "is_active": True
                 }
-                products_to_insert.append(product_doc)
+                for product, product_id, text_embedding, image_embedding
+                in zip(products, product_ids, text_embeddings, image_embeddings)
+            ]
             
             # Insert into MongoDB
             if products_to_insert:
-                result = self.db.products.insert_many(products_to_insert)
-                inserted_ids = [str(id) for id in result.inserted_ids]
+                # Unordered bulk insert: the server applies documents in parallel, and any
+                # that fail are reported instead of aborting the rest
+                failed_indexes = set()
+                try:
+                    await self.async_db.products.insert_many(products_to_insert, ordered=False)
+                except BulkWriteError as e:
+                    failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+                    logger.warning(f"{len(failed_indexes)} of {len(products_to_insert)} products failed to insert")
+                inserted = [i for i in range(len(products_to_insert)) if i not in failed_indexes]
+                inserted_ids = [str(product_ids[i]) for i in inserted]
                 
-                # Generate & store embeddings in Qdrant
-                await self._generate_and_store_embeddings(products_to_insert, inserted_ids, user_id)
+                # Generate & store embeddings in Qdrant, only for documents MongoDB confirmed
+                if inserted:
+                    await self._generate_and_store_embeddings(
+                        [products[i] for i in inserted],
+                        inserted_ids,
+                        user_id,
+                        [text_embeddings[i] for i in inserted],
+                        [names[i] for i in inserted],
+                        [categories[i] for i in inserted],
+                        current_time
+                    )
                 
                 return {
                     "inserted_count": len(inserted_ids),
@@ -99,20 +335,32 @@ class ProductHandler:
             logger.error(f"Error in process_product_upload: {str(e)}", exc_info=True)
             raise
     
-    async def _generate_and_store_embeddings(self, products: List[Dict[str, Any]], product_ids: List[str], user_id: str):
-        """Generate and store vector embeddings for products"""
+    async def _generate_and_store_embeddings(
+        self,
+        products: List[Dict[str, Any]],
+        product_ids: List[str],
+        user_id: str,
+        text_embeddings: List[List[float]],
+        names: List[str],
+        categories: List[str],
+        created_at: datetime
+    ):
+        """Store the product vectors computed during upload in Qdrant
+        
+        text_embeddings, names and categories are the column lists built in
+        process_product_upload, aligned index-for-index with products.
+        """
         try:
-            for product, product_id in zip(products, product_ids):
-                text = f"{product['name']} {product['description']} {product['category']}"
-                
-                # Use CLIP embeddings for all products to ensure consistency with Qdrant collection
-                embedding = clip_manager.get_text_embedding(text)
-                
+            points = []
+            for product, product_id, embedding, name, category in zip(
+                products, product_ids, text_embeddings, names, categories
+            ):
                 # Prepare metadata with image information
                 metadata = {
-                    "name": product["name"],
-                    "price": product["price"],
-                    "created_by": user_id
+                    "name": name,
+                    "price": product.get("price", 0.0),
+                    "created_by": user_id,
+                    "created_at": created_at.isoformat()  # Indexed as a datetime payload field
                 }
                 
                 # Include image information if available
@@ -123,25 +371,22 @@ class ProductHandler:
                 if "image_path" in product and product["image_path"]:
                     metadata["image_path"] = product["image_path"]
                 
-                qdrant_manager.upsert_product(
-                    product_id=product_id,
-                    text_embedding=embedding,
-                    category=product["category"],
-                    metadata=metadata
-                )
+                points.append({
+                    "product_id": product_id,
+                    "text_embedding": embedding,
+                    "category": category,
+                    "metadata": metadata
+                })
+            
+            # Send every point in one request instead of one RPC per product, off the event loop
+            await asyncio.to_thread(qdrant_manager.upsert_products_batch, points)
         except Exception as e:
             logger.error(f"Error generating/storing embeddings: {str(e)}", exc_info=True)
             pass
 
     def _is_valid_objectid(self, user_id: str) -> bool:
         """Check if user_id is a valid MongoDB ObjectId format"""
-        if not user_id or len(user_id) != 24:
-            return False
-        try:
-            int(user_id, 16)  # Check if it's a valid hex string
-            return all(c in '0123456789abcdefABCDEF' for c in user_id)
-        except ValueError:
-            return False
+        return bool(user_id) and _OBJECTID_RE.fullmatch(user_id) is not None
 
     def _normalize_user_id(self, user_id: str) -> str:
         """Normalize user ID format and handle both UUID and ObjectId"""
@@ -203,65 +448,138 @@ class ProductHandler:
             logger.error(f"Error validating product data: {e}")
             return False
 
-    def _calculate_relevance_score(self, product: Dict[str, Any], query: str, category: str, similarity_score: float) -> float:
-        """Calculate enhanced relevance score based on multiple factors"""
+    def _relevance_features(self, product: Dict[str, Any], query_lower: str, query_words: List[str], category_lower: str) -> tuple:
+        """Extract the per-product text/price features consumed by _relevance_kernel"""
+        product_name = (product.get("name", "") or "").lower()
+        product_description = (product.get("description", "") or "").lower()
+        product_category = (product.get("category", "") or "").lower()
+        
+        # Query words contain no whitespace, so "substring of some word" is the same as
+        # "substring of the text" - one C-level scan per query word instead of one per word pair
+        description_head = " ".join(product_description.split()[:50])  # Limit description words
+        
+        # Query-keyword matching ratios for name (higher weight) and description (lower weight)
+        name_matches = sum(1 for qw in query_words if qw in product_name)
+        name_match_ratio = name_matches / len(query_words) if query_words else 0
+        desc_matches = sum(1 for qw in query_words if qw in description_head)
+        desc_match_ratio = desc_matches / len(query_words) if query_words else 0
+        
+        category_match = bool(category_lower and category_lower in product_category)
+        
+        # Exact phrase matching (higher bonus for name than for first 200 chars of description)
+        if query_lower in product_name:
+            phrase_bonus = 25
+        elif query_lower in product_description[:200]:
+            phrase_bonus = 15
+        else:
+            phrase_bonus = 0
+        
+        # Price reasonableness (products with reasonable prices get slight bonus)
+        price = product.get("price", 0)
         try:
-            base_score = similarity_score * 100  # Base score from vector similarity
-            relevance_score = base_score
-            
-            if not query:
-                return base_score
-            
-            query_lower = query.lower().strip()
-            product_name = (product.get("name", "") or "").lower()
-            product_description = (product.get("description", "") or "").lower()
-            product_category = (product.get("category", "") or "").lower()
-            
-            # Query-keyword matching bonus
+            price = float(price) if price is not None else 0
+            reasonable_price = 10 <= price <= 10000
+        except (ValueError, TypeError):
+            # Skip price bonus if price is invalid
+            reasonable_price = False
+        
+        in_stock = bool(product.get("in_stock", True))
+        
+        return (name_match_ratio, desc_match_ratio, category_match, phrase_bonus, reasonable_price, in_stock)
+
+    def _score_results(self, results: List[Dict[str, Any]], products: List[Dict[str, Any]], query: str, category: str):
+        """Fill in relevance_score for each result from its product document in one vectorized pass"""
+        if not results:
+            return
+        
+        similarity = np.array([r["similarity_score"] for r in results], dtype=np.float64)
+        query_lower = query.lower().strip()
+        
+        if query_lower:
             query_words = query_lower.split()
-            name_words = product_name.split()
-            description_words = product_description.split()[:50]  # Limit description words
-            
-            # Name matching (higher weight)
-            name_matches = sum(1 for qw in query_words if any(qw in nw for nw in name_words))
-            name_match_ratio = name_matches / len(query_words) if query_words else 0
-            relevance_score += name_match_ratio * 20
-            
-            # Description matching (lower weight)
-            desc_matches = sum(1 for qw in query_words if any(qw in dw for dw in description_words))
-            desc_match_ratio = desc_matches / len(query_words) if query_words else 0
-            relevance_score += desc_match_ratio * 10
-            
-            # Category matching bonus
-            if category and category.lower() in product_category:
-                relevance_score += 15
-            
-            # Exact phrase matching (higher bonus)
-            if query_lower in product_name:
-                relevance_score += 25
-            elif query_lower in product_description[:200]:  # Check first 200 chars of description
-                relevance_score += 15
-            
-            # Price reasonableness (products with reasonable prices get slight bonus)
-            price = product.get("price", 0)
-            try:
-                price = float(price) if price is not None else 0
-                if 10 <= price <= 10000:  # Reasonable price range
-                    relevance_score += 5
-            except (ValueError, TypeError):
-                # Skip price bonus if price is invalid
-                pass
-            
-            # In-stock bonus
-            if product.get("in_stock", True):
-                relevance_score += 3
-            
-            # Normalize final score
-            return min(max(0, relevance_score), 100)
-            
-        except Exception as e:
-            logger.error(f"Error calculating relevance score: {e}")
-            return similarity_score * 100
+            category_lower = category.lower()
+            features = []
+            for product in products:
+                try:
+                    features.append(self._relevance_features(product, query_lower, query_words, category_lower))
+                except Exception as e:
+                    logger.error(f"Error calculating relevance score: {e}")
+                    features.append((0, 0, False, 0, False, False))  # Similarity only
+            relevance = _relevance_kernel(similarity, np.array(features, dtype=np.float64))
+        else:
+            relevance = similarity * 100
+        
+        for result, relevance_score in zip(results, relevance.tolist()):
+            result["relevance_score"] = relevance_score
+
+    def _fuse_modal_results(
+        self,
+        text_results: List[Dict[str, Any]],
+        image_results: List[Dict[str, Any]],
+        text_weight: float = 0.5
+    ) -> List[Dict[str, Any]]:
+        """
+        Merge per-modality search hits by product ID using a weighted score
+        
+        The fusion runs here, client-side. A product missing from one modality's hits
+        contributes 0 for that modality, so a single-modality hit scores at most its
+        own weight (half, by default).
+        """
+        fused = {}
+        for weight, hits in ((text_weight, text_results), (1.0 - text_weight, image_results)):
+            for hit in hits:
+                product_id = hit.get("product_id")
+                if not product_id:
+                    continue
+                if product_id not in fused:
+                    fused[product_id] = {**hit, "score": 0.0}
+                fused[product_id]["score"] += weight * float(hit.get("score") or 0.0)
+        
+        return sorted(fused.values(), key=lambda x: x["score"], reverse=True)
+
+    async def _search_with_fallback(
+        self,
+        query_embedding,
+        user_id: Optional[str] = None,
+        category_filter: Optional[str] = None,
+        jewelry_type: Optional[str] = None,
+        limit: int = 10,
+        min_score: float = 0.05,
+        candidate_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run asearch_similar_products, loosening the search until one attempt returns results
+        
+        The full search comes first. When scoped to a user, it is retried with a relaxed
+        threshold (user isolation is always kept). Finally, the user and category conditions
+        alone are tried, dropping the jewelry type and keyword-candidate restrictions.
+        """
+        attempts = [(min_score, jewelry_type, candidate_ids)]
+        if user_id:
+            attempts.append((min_score * 0.5, jewelry_type, candidate_ids))
+        if category_filter and (jewelry_type or candidate_ids):
+            attempts.append((min_score, None, None))
+        elif candidate_ids:
+            # None of the keyword candidates cleared the threshold; search everything
+            attempts.append((min_score, jewelry_type, None))
+        
+        search_results = []
+        for attempt, (score_threshold, attempt_jewelry_type, attempt_candidates) in enumerate(attempts):
+            search_results = await qdrant_manager.asearch_similar_products(
+                query_embedding=query_embedding,
+                user_id=user_id,
+                category_filter=category_filter,
+                jewelry_type=attempt_jewelry_type,
+                limit=limit,
+                min_score=score_threshold,
+                candidate_ids=attempt_candidates
+            )
+            if search_results:
+                if attempt:
+                    logger.info(f"Found results on fallback attempt {attempt}")
+                break
+        
+        return search_results
 
     def _detect_category_from_query(self, query: str) -> str:
         """
@@ -280,48 +598,26 @@ class ProductHandler:
         query_lower = query.lower().strip()
         logger.debug(f"Detecting category from query: {query_lower}")
         
-        # Special handling for jewelry-related queries
-        jewelry_terms = [
-            'jewelry', 'jewellery', 'necklace', 'ring', 'earring', 'bracelet', 
-            'pendant', 'chain', 'bangle', 'anklet', 'brooch', 'gemstone',
-            'diamond', 'gold', 'silver', 'platinum', 'pearl', 'crystal'
-        ]
+        # Query tokens exactly as the old f' {keyword} ' in f' {query} ' test delimited them
+        query_parts = query_lower.split(' ')
         
-        # Check for jewelry terms first with exact matching
-        for term in jewelry_terms:
-            if f' {term} ' in f' {query_lower} ':
-                logger.debug(f"Detected jewelry term in query: {term}")
-                return 'jewelry'
+        # Special handling for jewelry-related queries
+        jewelry_term = next((part for part in query_parts if part in _JEWELRY_QUERY_TERMS), None)
+        if jewelry_term:
+            logger.debug(f"Detected jewelry term in query: {jewelry_term}")
+            return 'jewelry'
         
-        # Score each category based on keyword matches
+        # Score each category by looking up every query n-gram in the keyword index
+        query_ngrams = {
+            ' '.join(query_parts[i:i + n])
+            for n in range(1, self._max_keyword_words + 1)
+            for i in range(len(query_parts) - n + 1)
+        }
         category_scores = {}
-        
-        for category, keywords in self.category_keywords.items():
-            score = 0
-            
-            # Check primary keywords (higher weight)
-            for keyword in keywords["primary"]:
-                if f' {keyword} ' in f' {query_lower} ':
-                    score += 3
-                    logger.debug(f"Matched primary keyword '{keyword}' for category '{category}'")
-                    
-            # Check type keywords (medium weight)
-            if "types" in keywords:
-                for keyword in keywords["types"]:
-                    if f' {keyword} ' in f' {query_lower} ':
-                        score += 2
-                        logger.debug(f"Matched type keyword '{keyword}' for category '{category}'")
-                        
-            # Check other keywords (lower weight)
-            for key in ["attributes", "brands", "materials"]:
-                if key in keywords:
-                    for keyword in keywords[key]:
-                        if f' {keyword} ' in f' {query_lower} ':
-                            score += 1
-                            logger.debug(f"Matched {key} keyword '{keyword}' for category '{category}'")
-            
-            if score > 0:
-                category_scores[category] = score
+        for ngram in query_ngrams:
+            for category, weight in self._category_keyword_index.get(ngram, ()):
+                category_scores[category] = category_scores.get(category, 0) + weight
+                logger.debug(f"Matched keyword '{ngram}' (weight {weight}) for category '{category}'")
         
         # Log the category scores for debugging
         if category_scores:
@@ -333,7 +629,11 @@ class ProductHandler:
         if not category_scores:
             return None
             
-        detected_category = max(category_scores.items(), key=lambda x: x[1])[0]
+        # Ties go to the category listed first in category_keywords
+        detected_category = max(
+            (category for category in self.category_keywords if category in category_scores),
+            key=category_scores.get
+        )
         logger.debug(f"Detected category: {detected_category}")
         return detected_category
 
@@ -371,17 +671,19 @@ class ProductHandler:
             if query and not any(word in query.lower() for word in ["jewelry", "jewellery"]):
                 enhanced_query = f"{query} jewelry"
             
-            # Generate embeddings
+            # Generate embeddings; CLIP runs in worker threads so the event loop isn't blocked
             query_embedding = None
             if enhanced_query and image_bytes:
                 # Combine text and image embeddings (60% text, 40% image)
-                text_embedding = clip_manager.get_text_embedding(enhanced_query)
-                image_embedding = clip_manager.get_image_embedding(image_bytes)
-                query_embedding = [0.6 * t + 0.4 * i for t, i in zip(text_embedding, image_embedding)]
+                text_embedding, image_embedding = await asyncio.gather(
+                    asyncio.to_thread(clip_manager.get_cached_text_embedding, enhanced_query),
+                    asyncio.to_thread(clip_manager.get_image_embedding, image_bytes)
+                )
+                query_embedding = clip_manager.combine_embeddings([text_embedding, image_embedding], [0.6, 0.4])
             elif enhanced_query:
-                query_embedding = clip_manager.get_text_embedding(enhanced_query)
+                query_embedding = await asyncio.to_thread(clip_manager.get_cached_text_embedding, enhanced_query)
             elif image_bytes:
-                query_embedding = clip_manager.get_image_embedding(image_bytes)
+                query_embedding = await asyncio.to_thread(clip_manager.get_image_embedding, image_bytes)
             
             if query_embedding is None:
                 raise ValueError("Either query text or image must be provided")
@@ -397,22 +699,21 @@ class ProductHandler:
             if normalized_user_id:
                 filter_conditions["user_id"] = normalized_user_id
             
-            # Debug: Check how many jewelry products exist in the database
-            jewelry_count = self.db.products.count_documents({"category": {"$regex": "jewel(r?y|ies)", "$options": "i"}})
-            logger.info(f"Found {jewelry_count} jewelry products in the database")
-            
-            # Debug: Log a sample of jewelry products
-            if jewelry_count > 0:
-                sample_products = list(self.db.products.find(
-                    {"category": {"$regex": "jewel(r?y|ies)", "$options": "i"}},
-                    {"name": 1, "category": 1, "user_id": 1, "_id": 0}
-                ).limit(3))
-                logger.info(f"Sample jewelry products: {sample_products}")
-            
-            logger.info(f"Searching jewelry with filter: {filter_conditions}")
-            
-            # Log the query embedding for debugging
-            logger.info(f"Searching with embedding (first 5 dims): {query_embedding[:5] if query_embedding else 'None'}")
+            # Debug-only diagnostics: these cost extra MongoDB round trips, so skip them unless enabled
+            if logger.isEnabledFor(logging.DEBUG):
+                jewelry_count = await self.async_db.products.count_documents({"category": {"$regex": "jewel(r?y|ies)", "$options": "i"}})
+                logger.debug(f"Found {jewelry_count} jewelry products in the database")
+                
+                # Log a sample of jewelry products
+                if jewelry_count > 0:
+                    sample_products = await self.async_db.products.find(
+                        {"category": {"$regex": "jewel(r?y|ies)", "$options": "i"}},
+                        {"name": 1, "category": 1, "user_id": 1, "_id": 0}
+                    ).to_list(length=3)
+                    logger.debug(f"Sample jewelry products: {sample_products}")
+                
+                logger.debug(f"Searching jewelry with filter: {filter_conditions}")
+                logger.debug(f"Searching with embedding (first 5 dims): {query_embedding[:5] if query_embedding else 'None'}")
             
             # Make search more lenient by lowering the min_score if it's too high
             effective_min_score = max(0.1, min_score)  # Ensure min_score is not too high
@@ -425,15 +726,12 @@ class ProductHandler:
             
             # Search Qdrant with the embedding using search_similar_products
             # For jewelry, use exact category name instead of regex pattern
-            category_filter = None
-            if filter_conditions.get("category", {}).get("$regex") == "jewel(r?y|ies)":
-                category_filter = "Jewellery"  # Use exact category name for Qdrant (British spelling)
-            elif filter_conditions.get("category", {}).get("$regex") == "clothing":
-                category_filter = "Clothes"  # Map "clothing" to "Clothes" for Qdrant
-            else:
-                category_filter = filter_conditions.get("category", {}).get("$regex")
+            category_filter = filter_conditions.get("category", {}).get("$regex")
+            if category_filter == "jewel(r?y|ies)":
+                category_filter = "jewelry"  # The jewelry regex stands for the detected "jewelry" category
+            category_filter = QDRANT_CATEGORY_ALIASES.get(category_filter, category_filter)
             
-            search_results = qdrant_manager.search_similar_products(
+            search_results = await self._search_with_fallback(
                 query_embedding=query_embedding,
                 user_id=user_id,
                 category_filter=category_filter,
@@ -451,7 +749,7 @@ class ProductHandler:
                     "timestamp": datetime.utcnow().isoformat()
                 }
                 
-            logger.info(f"Found {len(search_results)} potential matches before filtering")
+            logger.debug("Found %d potential matches before filtering", len(search_results))
             
             if not search_results:
                 logger.warning("No search results returned from Qdrant")
@@ -494,10 +792,12 @@ class ProductHandler:
                 }
                 
             # Fetch all products in a single query for better performance
-            products_map = {
-                str(product["_id"]): product 
-                for product in self.db.products.find({"_id": {"$in": product_ids}})
-            }
+            products_cursor = self.async_db.products.find(
+                {"_id": {"$in": product_ids}},
+                projection=SEARCH_RESULT_PROJECTION,
+                batch_size=len(product_ids)
+            )
+            products_map = {str(product["_id"]): product async for product in products_cursor}
             
             # Process and rank results
             results = []
@@ -530,8 +830,14 @@ class ProductHandler:
                         logger.warning(f"Product not found in MongoDB: {product_id}")
                         continue
                     
+                    result = {key: product.get(key, payload.get(key, default)) for key, default in JEWELRY_RESULT_FIELDS}
+                    result["price"] = float(result["price"])
+                    result["category"] = payload.get("category", product.get("category", ""))
+                    # MongoDB only: the payload's image_url may be an uploaded base64 image
+                    result["image_url"] = product.get("image_url", "")
+                    product_name = result["name"]
+                    
                     # Log product details for debugging
-                    product_name = product.get('name', 'Unnamed Product')
                     logger.debug(f"Processing product: {product_name} (ID: {product_id})")
                     
                     # Calculate relevance score with bonus for type matches
@@ -542,17 +848,10 @@ class ProductHandler:
                         relevance_score *= 1.5
                         logger.debug(f"Boosted score for {product_name} - New score: {relevance_score}")
                     
-                    # Get additional fields from payload if available
-                    product_category = payload.get('category', product.get('category', ''))
-                    
                     # Add to results
                     results.append({
                         "id": product_id,
-                        "name": product_name,
-                        "description": product.get("description", ""),
-                        "price": float(product.get("price", 0)),
-                        "category": product_category,
-                        "image_url": product.get("image_url", ""),
+                        **result,
                         "similarity_score": float(score),
                         "relevance_score": relevance_score
                     })
@@ -560,11 +859,8 @@ class ProductHandler:
                     logger.error(f"Error processing search result: {str(e)}", exc_info=True)
                     continue
             
-            # Sort by relevance score (highest first)
-            results.sort(key=lambda x: x["relevance_score"], reverse=True)
-            
-            # Apply limit
-            results = results[:limit]
+            # Keep the top `limit` by relevance score (highest first) without sorting every hit
+            results = heapq.nlargest(limit, results, key=operator.itemgetter("relevance_score"))
             
             if not results:
                 logger.warning("No jewelry items found matching the query after filtering")
@@ -577,8 +873,9 @@ class ProductHandler:
                 }
             
             logger.info(f"Found {len(results)} jewelry items (top score: {results[0]['similarity_score']:.3f})")
-            for i, r in enumerate(results[:3], 1):
-                logger.info(f"  {i}. {r['name']} (Score: {r['similarity_score']:.3f})")
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, r in enumerate(results[:3], 1):
+                    logger.debug(f"  {i}. {r['name']} (Score: {r['similarity_score']:.3f})")
             
             return {
                 "results": results,
@@ -618,68 +915,17 @@ class ProductHandler:
             Dictionary with search results and metadata
         """
         try:
-            # Define product types and their variations
-            product_types = {
-                # Jewelry
-                'earring': {
-                    'keywords': ['earring', 'earrings', 'stud', 'studs', 'hoop', 'hoops', 'dangle'],
-                    'category': 'jewelry'
-                },
-                'ring': {
-                    'keywords': ['ring', 'rings', 'band', 'bands', 'wedding ring', 'engagement ring'],
-                    'category': 'jewelry'
-                },
-                'necklace': {
-                    'keywords': ['necklace', 'necklaces', 'pendant', 'pendants', 'chain', 'chains', 'choker'],
-                    'category': 'jewelry'
-                },
-                'bracelet': {
-                    'keywords': ['bracelet', 'bracelets', 'bangle', 'bangles', 'cuff', 'cuffs'],
-                    'category': 'jewelry'
-                },
-                'watch': {
-                    'keywords': ['watch', 'watches', 'timepiece', 'wristwatch'],
-                    'category': 'jewelry'
-                },
-                # Electronics
-                'smartphone': {
-                    'keywords': ['smartphone', 'phone', 'mobile', 'iphone', 'android', 'cellphone'],
-                    'category': 'electronics'
-                },
-                'laptop': {
-                    'keywords': ['laptop', 'notebook', 'macbook', 'ultrabook', 'chromebook'],
-                    'category': 'electronics'
-                },
-                'headphones': {
-                    'keywords': ['headphones', 'earbuds', 'earphones', 'airpods', 'headset', 'earpods'],
-                    'category': 'electronics'
-                },
-                'tablet': {
-                    'keywords': ['tablet', 'ipad', 'android tablet', 'e-reader', 'kindle'],
-                    'category': 'electronics'
-                },
-                'camera': {
-                    'keywords': ['camera', 'dslr', 'mirrorless', 'point and shoot', 'action camera'],
-                    'category': 'electronics'
-                },
-                'tv': {
-                    'keywords': ['tv', 'television', 'smart tv', '4k tv', 'led tv', 'oled tv'],
-                    'category': 'electronics'
-                },
-                # Add more categories and product types as needed
-            }
-            
             # Detect product type from query
             product_type = None
             detected_category = category
             query_lower = query.lower() if query else ""
             
-            # Check for product type in query with improved keyword matching
-            for p_type, p_data in product_types.items():
-                if any(keyword in query_lower for keyword in p_data['keywords']):
+            # Check for product type in query, one precompiled keyword scan per type in priority order
+            for p_type, keyword_pattern, p_category in _PRODUCT_TYPE_PATTERNS:
+                if keyword_pattern.search(query_lower):
                     product_type = p_type
                     if not detected_category:
-                        detected_category = p_data['category']
+                        detected_category = p_category
                     break
             
             # Enhance query with product type if found
@@ -687,8 +933,10 @@ class ProductHandler:
             if product_type and not any(word in query_lower for word in [product_type, product_type + 's']):
                 enhanced_query = f"{query} {product_type}"
             
+            is_jewelry = bool(detected_category) and "jewel" in detected_category.lower()
+            
             # If this is a jewelry search, use the specialized function
-            if detected_category and "jewel" in detected_category.lower() and product_type in ['earring', 'ring', 'necklace', 'bracelet', 'watch']:
+            if is_jewelry and product_type in _JEWELRY_PRODUCT_TYPES:
                 return await self.search_jewelry(
                     query=enhanced_query,
                     image_bytes=image_bytes,
@@ -705,61 +953,72 @@ class ProductHandler:
             
             # Generate embeddings based on enhanced query
             query_embedding = None
+            text_embedding = None
+            image_embedding = None
             
             if enhanced_query and image_bytes:
-                # Both text and image provided - combine embeddings
-                text_embedding = clip_manager.get_text_embedding(enhanced_query)
-                image_embedding = clip_manager.get_image_embedding(image_bytes)
-                query_embedding = [0.5 * t + 0.5 * i for t, i in zip(text_embedding, image_embedding)]
-                logger.info("Combined text and image embeddings (50/50)")
+                # Both text and image provided - search each modality, then fuse the scores below
+                # Encode both modalities concurrently off the event loop
+                text_embedding, image_embedding = await asyncio.gather(
+                    asyncio.to_thread(clip_manager.get_cached_text_embedding, enhanced_query),
+                    asyncio.to_thread(clip_manager.get_image_embedding, image_bytes)
+                )
+                logger.debug("Generated text and image embeddings for batched search")
             elif enhanced_query:
-                query_embedding = clip_manager.get_text_embedding(enhanced_query)
-                logger.info("Generated text embedding")
+                query_embedding = await asyncio.to_thread(clip_manager.get_cached_text_embedding, enhanced_query)
+                logger.debug("Generated text embedding")
             elif image_bytes:
-                query_embedding = clip_manager.get_image_embedding(image_bytes)
-                logger.info("Generated image embedding")
+                query_embedding = await asyncio.to_thread(clip_manager.get_image_embedding, image_bytes)
+                logger.debug("Generated image embedding")
             
-            if query_embedding is None:
+            if query_embedding is None and text_embedding is None:
                 raise ValueError("Either query text or image must be provided")
             
-            # Build filter conditions
-            filter_conditions = {}
-            if detected_category:
-                filter_conditions["category"] = detected_category.lower()
-            
-            # Add user filter if specified
-            if normalized_user_id:
-                filter_conditions["user_id"] = normalized_user_id
-            
-            # If we have a specific product type, add it to the filter
-            if product_type:
-                # For jewelry, use jewelry_type, for others use product_type
-                if detected_category and "jewel" in detected_category.lower():
-                    filter_conditions["jewelry_type"] = product_type
-                else:
-                    filter_conditions["product_type"] = product_type
-            
-            logger.info(f"Searching with filter: {filter_conditions}")
-            
-            # Get category filter if specified
-            category_filter = filter_conditions.get("category")
+            # Get category filter if specified; qdrant_manager turns these arguments into a Filter
+            category_filter = detected_category.lower() if detected_category else None
             
             # Map detected categories to Qdrant format (case-sensitive)
-            if category_filter == "clothing":
-                category_filter = "Clothes"
-            elif category_filter == "jewelry":
-                category_filter = "Jewellery"
+            category_filter = QDRANT_CATEGORY_ALIASES.get(category_filter, category_filter)
             
-            # Search Qdrant with the embedding using search_similar_products
-            search_results = qdrant_manager.search_similar_products(
-                query_embedding=query_embedding,
-                user_id=normalized_user_id,
-                category_filter=category_filter,
-                jewelry_type=product_type if category and "jewel" in category.lower() else None,  # Pass jewelry type to the search
-                limit=limit * 2,  # Get more results for better filtering
-                min_score=min_score
+            jewelry_type_filter = product_type if category and "jewel" in category.lower() else None
+            
+            logger.debug(
+                "Searching with filter: category=%s, jewelry_type=%s, user_id=%s",
+                category_filter, jewelry_type_filter, normalized_user_id
             )
             
+            if text_embedding is not None and image_embedding is not None:
+                # One batched Qdrant request scores both modalities independently
+                text_results, image_results = await qdrant_manager.asearch_batch(
+                    query_embeddings=[text_embedding, image_embedding],
+                    user_id=normalized_user_id,
+                    category_filter=category_filter,
+                    jewelry_type=jewelry_type_filter,
+                    limit=limit,
+                    min_score=min_score
+                )
+                search_results = self._fuse_modal_results(text_results, image_results)
+                logger.debug("Fused %d text and %d image hits (50/50)", len(text_results), len(image_results))
+            else:
+                # For text queries, a cheap keyword search narrows the dense search when
+                # it yields enough candidates; otherwise fall back to pure dense search
+                candidate_ids = None
+                if enhanced_query and not image_bytes:
+                    keyword_ids = await self._keyword_candidates(enhanced_query, normalized_user_id)
+                    if len(keyword_ids) >= limit * 2:
+                        candidate_ids = keyword_ids
+                
+                # Search Qdrant with the embedding using search_similar_products
+                search_results = await self._search_with_fallback(
+                    query_embedding=query_embedding,
+                    user_id=normalized_user_id,
+                    category_filter=category_filter,
+                    jewelry_type=jewelry_type_filter,  # Pass jewelry type to the search
+                    limit=limit,  # Filters are applied inside Qdrant, so no over-fetch is needed
+                    min_score=min_score,
+                    candidate_ids=candidate_ids
+                )
+            
             if not search_results:
                 return {
                     "results": [],
@@ -770,7 +1029,10 @@ class ProductHandler:
                 }
                 
             # Get product details from MongoDB for the search results
-            product_ids = [ObjectId(item.get("product_id")) for item in search_results if item.get("product_id")]
+            result_ids = [item.get("product_id") for item in search_results]
+            product_ids = [ObjectId(pid) for pid in result_ids if pid and _OBJECTID_RE.match(pid)]
+            if len(product_ids) < len(result_ids):
+                logger.debug(f"Dropped {len(result_ids) - len(product_ids)} results without a valid product ID")
             
             if not product_ids:
                 return {
@@ -781,99 +1043,115 @@ class ProductHandler:
                     "timestamp": datetime.utcnow().isoformat()
                 }
                 
-            # Fetch all products in a single query for better performance
-            products_map = {
-                str(product["_id"]): product 
-                for product in self.db.products.find({"_id": {"$in": product_ids}})
-            }
+            hits_by_id = {str(item.get("product_id")): item for item in search_results}
             
-            # Process and rank results
+            # Fetch all products in a single non-blocking query and build results as they stream in
             results = []
-            for item in search_results:
-                try:
-                    product_id = str(item.get("product_id"))
-                    if not product_id or product_id == 'None':
-                        continue
-                        
-                    product = products_map.get(product_id)
-                    if not product:
-                        logger.warning(f"Product not found in MongoDB: {product_id}")
-                        continue
-                    
-                    # Log product details for debugging
-                    logger.debug(f"Processing product: {product.get('name')} (ID: {product_id})")
-                    
-                    # Calculate relevance score
-                    relevance_score = self._calculate_relevance_score(
-                        product=product,
-                        query=query or "",
-                        category=category or "",
-                        similarity_score=item.get("score", 0)
-                    )
-                    
-                    # Add to results
-                    results.append({
-                        "id": product_id,
-                        "name": product.get("name", ""),
-                        "description": product.get("description", ""),
-                        "price": float(product.get("price", 0)),
-                        "category": product.get("category", ""),
-                        "image_url": product.get("image_url", ""),
-                        "similarity_score": float(item.get("score", 0)),
-                        "relevance_score": relevance_score
-                    })
-                except Exception as e:
-                    logger.error(f"Error processing search result: {str(e)}", exc_info=True)
+            matched_products = []
+            products_cursor = self.async_db.products.find(
+                {"_id": {"$in": product_ids}},
+                projection=SEARCH_RESULT_PROJECTION,
+                batch_size=len(product_ids)
+            )
+            async for product in products_cursor:
+                product_id = str(product["_id"])
+                item = hits_by_id.get(product_id)
+                if item is None:
+                    continue
+                
+                price = _parse_price(product.get("price", 0))
+                if price is None:
+                    logger.warning(f"Skipping product {product_id} with invalid price: {product.get('price')!r}")
                     continue
+                
+                # Add to results; relevance is scored for the whole batch below
+                result = {
+                    "id": product_id,
+                    "name": product.get("name", ""),
+                    "description": product.get("description", ""),
+                    "price": price,
+                    "category": product.get("category", ""),
+                    "image_url": product.get("image_url", ""),
+                    "similarity_score": float(item.get("score", 0)),
+                    "relevance_score": 0.0
+                }
+                results.append(result)
+                matched_products.append(product)
+            
+            # Score large batches in a worker thread so the event loop stays responsive
+            if len(results) >= OFFLOAD_SCORING_MIN_RESULTS:
+                await asyncio.to_thread(self._score_results, results, matched_products, query or "", category or "")
+            else:
+                self._score_results(results, matched_products, query or "", category or "")
+            
+            if len(results) < len(product_ids):
+                logger.warning(f"{len(product_ids) - len(results)} search results not found in MongoDB or failed to score")
             
             # Process the results after collecting them
-            logger.info(f"After category filtering: {len(results)} products")
+            logger.debug("After category filtering: %d products", len(results))
             
             # Apply intelligent filtering - only show products with significant relevance
             if results:
-                # Sort results by relevance score
-                results.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+                # Partial top-5 selection is all the gap analysis needs; avoid sorting everything
+                # Every result carries both scores, so plain itemgetters replace per-item dict.get calls
+                scores = np.fromiter(
+                    map(operator.itemgetter('relevance_score'), results), dtype=np.float64, count=len(results)
+                )
+                similarities = np.fromiter(
+                    map(operator.itemgetter('similarity_score'), results), dtype=np.float64, count=len(results)
+                )
+                kept_idx = np.arange(len(results))  # Positions of the kept results, for the stats below
+                k = min(5, len(results))
+                top_idx = np.argpartition(-scores, k - 1)[:k]
+                top_idx = top_idx[np.argsort(-scores[top_idx], kind='stable')]
+                top_results = [results[i] for i in top_idx]
                 
                 # If we have more than one result, analyze score gaps
                 if len(results) > 1:
-                    # Calculate score gaps between consecutive products
-                    score_gaps = []
-                    for i in range(1, min(len(results), 5)):  # Look at top 5 gaps
-                        gap = results[i-1].get('relevance_score', 0) - results[i].get('relevance_score', 0)
-                        score_gaps.append(gap)
+                    # Score gaps between consecutive top products (scores are descending)
+                    score_gaps = -np.diff(scores[top_idx])
+                    gap_index = int(score_gaps.argmax())
+                    max_gap = float(score_gaps[gap_index])
                     
-                    logger.info(f"Score gaps: {score_gaps}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Score gaps: {score_gaps.tolist()}")
                     
                     # Find the largest gap in top results
-                    if score_gaps and max(score_gaps) > 10:  # If there's a significant gap (>10 points)
-                        gap_index = score_gaps.index(max(score_gaps))
-                        results = results[:gap_index + 1]  # Cut off at the gap
-                        logger.info(f"Filtered results to {len(results)} products due to significant score gap of {max(score_gaps):.1f}")
+                    if max_gap > 10:  # If there's a significant gap (>10 points)
+                        results = top_results[:gap_index + 1]  # Cut off at the gap
+                        kept_idx = top_idx[:gap_index + 1]
+                        logger.debug("Filtered results to %d products due to significant score gap of %.1f", len(results), max_gap)
                     else:
                         # If no significant gaps, only show products above 70% relevance
-                        high_relevance_products = [p for p in results if p.get('relevance_score', 0) >= 70]
-                        logger.info(f"High relevance products (>=70%): {len(high_relevance_products)}")
+                        high_idx = np.flatnonzero(scores >= 70)
+                        logger.debug("High relevance products (>=70%%): %d", len(high_idx))
                         
-                        if high_relevance_products:
-                            results = high_relevance_products
-                            logger.info(f"Filtered to {len(results)} high-relevance products (>=70%)")
+                        if len(high_idx):
+                            # Only this path can keep many results, so only it needs a full sort
+                            high_idx = high_idx[np.argsort(-scores[high_idx], kind='stable')]
+                            results = [results[i] for i in high_idx]
+                            kept_idx = high_idx
+                            logger.debug("Filtered to %d high-relevance products (>=70%%)", len(results))
                         else:
                             # If no high relevance products, show top 3 maximum
-                            results = results[:3]
-                            logger.info("Limited to top 3 products due to low overall relevance")
+                            results = top_results[:3]
+                            kept_idx = top_idx[:3]
+                            logger.debug("Limited to top 3 products due to low overall relevance")
                 
                 # Log final results
-                logger.info(f"After intelligent filtering: {len(results)} products")
                 logger.info(f"Search completed. Found {len(results)} results")
                 
-                if results:
+                if results and logger.isEnabledFor(logging.DEBUG):
                     logger.debug(f"Top result: {results[0].get('name', 'N/A')} "
                                 f"(Relevance: {results[0].get('relevance_score', 0):.1f}, "
                                 f"Similarity: {results[0].get('similarity_score', 0):.2f})")
                 
-                # Calculate search statistics
-                avg_relevance = sum(p.get('relevance_score', 0) for p in results) / len(results) if results else 0
-                avg_similarity = sum(p.get('similarity_score', 0) for p in results) / len(results) if results else 0
+                # Calculate search statistics from the score arrays built above, no second pass over results
+                kept_scores = scores[kept_idx]
+                avg_relevance = float(kept_scores.mean())
+                avg_similarity = float(similarities[kept_idx].mean())
+                min_relevance = float(kept_scores.min())
+                max_relevance = float(kept_scores.max())
                 
                 # Prepare final response
                 response = {
@@ -896,8 +1174,8 @@ class ProductHandler:
                             "total_found": len(results),
                             "average_relevance_score": round(avg_relevance, 2),
                             "average_similarity_score": round(avg_similarity, 3),
-                            "min_relevance_score": min([p.get('relevance_score', 0) for p in results], default=0) if results else 0,
-                            "max_relevance_score": max([p.get('relevance_score', 0) for p in results], default=0) if results else 0
+                            "min_relevance_score": min_relevance,
+                            "max_relevance_score": max_relevance
                         }
                     }
                 }
@@ -971,31 +1249,29 @@ class ProductHandler:
             
             # Check if we need to extract category from query text
             query_lower = (query_text or "").lower()
-            jewelry_categories = ["earrings", "bracelets", "necklaces", "rings", "bangles", "watches"]
             
             # If no explicit category is provided, try to extract from query text
             if not category:
-                for cat in jewelry_categories:
-                    if cat in query_lower:
-                        category = cat  # Set the category to the matched one
-                        logger.info(f"Extracted category from query: {category}")
-                        break
-            
-            # Generate text embedding if query_text is provided
-            if query_text:
-                text_embedding = clip_manager.get_text_embedding(query_text)
-            
-            # Generate image embedding if query_image is provided
-            if query_image:
-                image_embedding = clip_manager.get_image_embedding(query_image)
+                match = _JEWELRY_CATEGORY_RE.search(query_lower)
+                if match:
+                    category = match.group(0)  # Set the category to the matched one
+                    logger.debug("Extracted category from query: %s", category)
+            
+            # Generate embeddings off the event loop, running both encoders concurrently when needed
+            if query_text and query_image:
+                text_embedding, image_embedding = await asyncio.gather(
+                    asyncio.to_thread(clip_manager.get_cached_text_embedding, query_text),
+                    asyncio.to_thread(clip_manager.get_image_embedding, query_image)
+                )
+            elif query_text:
+                text_embedding = await asyncio.to_thread(clip_manager.get_cached_text_embedding, query_text)
+            elif query_image:
+                image_embedding = await asyncio.to_thread(clip_manager.get_image_embedding, query_image)
             
             # Determine which embedding to use for search
             if text_embedding is not None and image_embedding is not None:
-                # Weighted combination (70% text, 30% image for jewelry)
-                search_embedding = [
-                    0.7 * t + 0.3 * i
-                    for t, i in zip(text_embedding, image_embedding)
-                ]
+                # Weighted combination (70% text, 30% image for jewelry), renormalized for DOT collections
+                search_embedding = clip_manager.combine_embeddings([text_embedding, image_embedding], [0.7, 0.3])
                 query_type = "image_and_text"
             elif text_embedding is not None:
                 search_embedding = text_embedding
@@ -1007,32 +1283,41 @@ class ProductHandler:
                 raise ValueError("Either query_text or query_image must be provided")
             
             # Search in Qdrant with category filter and strict user scoping when provided
-            logger.info(f"Searching with embedding size: {len(search_embedding)}")
-            search_results = qdrant_manager.search_similar_products(
+            logger.debug("Searching with embedding size: %d", len(search_embedding))
+            search_results = await self._search_with_fallback(
                 query_embedding=search_embedding,
                 user_id=user_id,
                 category_filter=category,
                 limit=limit,
                 min_score=min_score
             )
-            logger.info(f"Raw search results count: {len(search_results)}")
+            logger.debug("Raw search results count: %d", len(search_results))
             
             # Log top 3 results for debugging
-            for i, result in enumerate(search_results[:3]):
-                # Support both dict results from search_similar_products and prior format
-                rid = result.get('id') or result.get('product_id')
-                rscore = result.get('score', 0)
-                rcat = result.get('category', 'N/A')
-                logger.info(f"Result {i+1} - ID: {rid}, Score: {rscore:.4f}, Category: {rcat}")
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, result in enumerate(search_results[:3]):
+                    # Support both dict results from search_similar_products and prior format
+                    rid = result.get('id') or result.get('product_id')
+                    rscore = result.get('score', 0)
+                    rcat = result.get('category', 'N/A')
+                    logger.debug(f"Result {i+1} - ID: {rid}, Score: {rscore:.4f}, Category: {rcat}")
             
             # Get product details from MongoDB
-            # Use a dictionary to store unique products by their ID
+            # Keep the highest score for each unique product ID (vectorized groupby-max)
             unique_product_ids = {}
-            for hit in search_results:
-                product_id = hit.get("product_id") or hit.get("id")
-                # Keep the highest score for each product
-                if product_id not in unique_product_ids or hit.get("score", 0) > unique_product_ids[product_id].get("score", 0):
-                    unique_product_ids[product_id] = {"id": product_id, "score": hit.get("score", 0)}
+            hits = [(hit.get("product_id") or hit.get("id"), hit.get("score", 0)) for hit in search_results]
+            hits = [(pid, score) for pid, score in hits if pid]
+            if hits:
+                hit_ids = np.array([pid for pid, _ in hits])
+                hit_scores = np.array([score for _, score in hits], dtype=np.float64)
+                order = np.argsort(-hit_scores, kind="stable")
+                # np.unique keeps the first occurrence, i.e. the best score after sorting
+                best_ids, first_index = np.unique(hit_ids[order], return_index=True)
+                best_scores = hit_scores[order][first_index]
+                unique_product_ids = {
+                    product_id: {"id": product_id, "score": score}
+                    for product_id, score in zip(best_ids.tolist(), best_scores.tolist())
+                }
             
             if not unique_product_ids:
                 return {
@@ -1045,13 +1330,9 @@ class ProductHandler:
                 }
             
             # Filter out invalid ObjectIds and get unique product IDs
-            valid_ids = []
-            for pid in unique_product_ids:
-                try:
-                    valid_ids.append(ObjectId(pid))
-                except:
-                    logger.warning(f"Invalid ObjectId: {pid}")
-                    continue
+            valid_ids = [ObjectId(pid) for pid in unique_product_ids if pid and _OBJECTID_RE.match(pid)]
+            if len(valid_ids) < len(unique_product_ids):
+                logger.debug(f"Dropped {len(unique_product_ids) - len(valid_ids)} results without a valid product ID")
             
             if not valid_ids:
                 return {
@@ -1063,25 +1344,24 @@ class ProductHandler:
                     "category_filter": category
                 }
             
-            # Get products from MongoDB
-            products_cursor = self.db.products.find(
-                {"_id": {"$in": valid_ids}}
+            # Get products from MongoDB without blocking the event loop
+            products_cursor = self.async_db.products.find(
+                {"_id": {"$in": valid_ids}},
+                projection=IMAGE_SEARCH_PROJECTION,
+                batch_size=min(100, len(valid_ids))
             )
             
             # Create a list of products with their scores
             products = []
-            for product in products_cursor:  # Use regular for loop since it's not async
+            async for product in products_cursor:
                 product_id = str(product["_id"])
                 if product_id in unique_product_ids:
                     product["_id"] = product_id
                     product["similarity_score"] = unique_product_ids[product_id]["score"]
                     products.append(product)
             
-            # Sort by score in descending order
-            products.sort(key=lambda x: x.get("similarity_score", 0), reverse=True)
-            
-            # Limit to the requested number of results
-            products = products[:limit]
+            # Top requested number of results by score, in descending order
+            products = heapq.nlargest(limit, products, key=operator.itemgetter("similarity_score"))
             
             return {
                 "status": "success",
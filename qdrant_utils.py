@@ -1,71 +1,240 @@
 # qdrant_utils.py
 # gemini_utils.py
 import os
+import asyncio
+import functools
+import uuid
+import httpx
+import numpy as np
 from dotenv import load_dotenv
 load_dotenv()  # 
 import logging
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
+import threading
+from typing import List, Dict, Any, Optional, Union
+from cachetools import TTLCache
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.exceptions import UnexpectedResponse
 
 from config import (
     QDRANT_URL,
     QDRANT_API_KEY,
-    QDRANT_COLLECTION_NAME
+    QDRANT_COLLECTION_NAME,
+    QDRANT_QUANTIZATION,
+    QDRANT_QUANTIZE_EXISTING,
+    QDRANT_PREFER_GRPC,
+    QDRANT_GRPC_PORT,
+    QDRANT_POOL_SIZE
 )
 
 logger = logging.getLogger(__name__)
 
+# HNSW graph settings for new collections; CLIP vectors benefit from m >= 32. The graph
+# stays in RAM even when the original vectors are on disk
+HNSW_CONFIG = models.HnswConfigDiff(m=32, ef_construct=256, on_disk=False)
+
+# Enough segments for Qdrant to search them in parallel across cores
+OPTIMIZERS_CONFIG = models.OptimizersConfigDiff(default_segment_number=max((os.cpu_count() or 4) // 2, 2))
+
+@functools.lru_cache(maxsize=128)
+def _search_params(limit: int, hnsw_ef: Optional[int] = None) -> models.SearchParams:
+    """
+    Search params for a query returning `limit` hits
+    
+    hnsw_ef defaults to scaling with the requested k rather than the server default. Quantized
+    vectors are searched first and the oversampled candidates rescored with the original vectors.
+    """
+    return models.SearchParams(
+        hnsw_ef=hnsw_ef or max(64, limit * 4),
+        quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+    )
+
+# Second stage of a two-stage search: exact rescoring of the prefetched short list
+RESCORE_PARAMS = models.SearchParams(quantization=models.QuantizationSearchParams(rescore=True))
+
+@functools.lru_cache(maxsize=128)
+def _prefetch_params(limit: int, hnsw_ef: Optional[int] = None) -> models.SearchParams:
+    """First-stage params: traverse on the quantized vectors only, leaving rescoring to the outer query"""
+    return models.SearchParams(
+        hnsw_ef=hnsw_ef or max(64, limit),
+        quantization=models.QuantizationSearchParams(rescore=False, ignore=False)
+    )
+
+# Embeddings may be passed as plain lists or numpy arrays
+Vector = Union[List[float], np.ndarray]
+
+def _as_vector_input(vector: Vector) -> List[float]:
+    """List form for request models (Prefetch, QueryRequest), whose validation rejects arrays"""
+    return vector.tolist() if isinstance(vector, np.ndarray) else vector
+
+def _normalize_label(value: str) -> str:
+    """Canonical form of a category or jewelry type, as stored in the *_norm payload fields"""
+    return value.strip().lower()
+
+# Points per upsert request; keeps each request body bounded on large uploads
+UPSERT_CHUNK_SIZE = 256
+
+# Payload fields search results are built from; the rest of the payload stays on the server
+RESULT_PAYLOAD_FIELDS = models.PayloadSelectorInclude(
+    include=["mongo_id", "name", "category", "jewelry_type", "price", "description", "image_url", "image_path", "image"]
+)
+
+# Payload fields search_similar results also expose at the top level
+SIMILAR_RESULT_FIELDS = ("name", "description", "category", "jewelry_type", "image_url")
+
+# Payload fields every search or sort touches, indexed once at startup so filtering never full-scans
+STARTUP_PAYLOAD_INDEXES = (
+    ("created_by", models.PayloadSchemaType.KEYWORD),
+    ("mongo_id", models.PayloadSchemaType.KEYWORD),  # Keyword-candidate MatchAny restriction
+    ("category_norm", models.PayloadSchemaType.KEYWORD),
+    ("jewelry_type_norm", models.PayloadSchemaType.KEYWORD),
+    ("created_at", models.PayloadSchemaType.DATETIME),
+)
+
+# Connection settings shared by the sync and async clients. REST calls (when gRPC is
+# off, and for a few admin endpoints) keep a warm HTTP/2 pool instead of reconnecting.
+# The client's server-version probe is skipped: it is a blocking request in __init__,
+# which would make importing this module contact the server
+CLIENT_KWARGS = dict(
+    url=QDRANT_URL,
+    api_key=QDRANT_API_KEY,
+    prefer_grpc=QDRANT_PREFER_GRPC,
+    grpc_port=QDRANT_GRPC_PORT,
+    timeout=30,
+    limits=httpx.Limits(
+        max_connections=QDRANT_POOL_SIZE,
+        max_keepalive_connections=QDRANT_POOL_SIZE,
+        keepalive_expiry=60
+    ),
+    http2=True,
+    check_compatibility=False
+)
+
 class QdrantManager:
     """Manager for Qdrant vector database operations"""
     
     def __init__(self):
         """Initialize Qdrant client"""
-        self.client = QdrantClient(
-            url=QDRANT_URL,
-            api_key=QDRANT_API_KEY
-        )
+        self.client = QdrantClient(**CLIENT_KWARGS)
+        # Async client for request handlers, so concurrent searches don't block the event loop
+        self.async_client = AsyncQdrantClient(**CLIENT_KWARGS)
         self.collection_name = QDRANT_COLLECTION_NAME
-        self._ensure_collection_exists()
+        # Payload fields already indexed (or attempted) by this process, so searches skip the RPC
+        self._ensured_indexes = set()
+        # Recent product search results; the short TTL bounds staleness from other writers
+        self._search_cache = TTLCache(maxsize=1024, ttl=60)
+        # TTLCache isn't thread-safe, and batch upserts run in worker threads
+        self._search_cache_lock = threading.Lock()
+        # Collection setup is deferred to first use, so importing this module needs no server
+        self._ready = False
+        self._ready_lock = threading.Lock()
+    
+    def _ensure_ready(self):
+        """Check/create the collection, startup indexes and normalized fields once, on first use"""
+        if self._ready:
+            return
+        with self._ready_lock:
+            if self._ready:
+                return
+            self._ensure_collection_exists()
+            for field, field_schema in STARTUP_PAYLOAD_INDEXES:
+                self._ensure_payload_indexes([field], field_schema)
+            self._ready = True
+            self.backfill_normalized_payload()
+    
+    async def _aensure_ready(self):
+        """Async variant of _ensure_ready; the one-time setup runs off the event loop"""
+        if not self._ready:
+            await asyncio.to_thread(self._ensure_ready)
+    
+    def _quantization_config(self) -> Optional[models.QuantizationConfig]:
+        """Quantization settings for new collections, selected by QDRANT_QUANTIZATION"""
+        if QDRANT_QUANTIZATION == "binary":
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        if QDRANT_QUANTIZATION == "int8":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(
+                    type=models.ScalarType.INT8,
+                    quantile=0.99,  # Clip outliers so the int8 range covers typical values
+                    always_ram=True
+                )
+            )
+        if QDRANT_QUANTIZATION != "none":
+            logger.warning(f"Unknown QDRANT_QUANTIZATION '{QDRANT_QUANTIZATION}', storing unquantized vectors")
+        return None
+    
+    def _create_collection(self, vector_size: int = 512):
+        """
+        Create the collection with float16 vectors and the configured quantization kept in RAM
+        
+        When quantized, the original vectors live on disk: traversal only touches the
+        in-RAM quantized copy and rescoring reads just the oversampled candidates. Points
+        and CLIP queries are unit length, so DOT ranks exactly like cosine without the
+        server re-normalizing every vector.
+        """
+        self._ensured_indexes.clear()  # A new collection starts without payload indexes
+        quantization_config = self._quantization_config()
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=models.VectorParams(
+                size=vector_size,
+                distance=models.Distance.DOT,
+                datatype=models.Datatype.FLOAT16,  # CLIP embeddings lose nothing measurable at half precision
+                on_disk=quantization_config is not None
+            ),
+            hnsw_config=HNSW_CONFIG,
+            optimizers_config=OPTIMIZERS_CONFIG,
+            quantization_config=quantization_config
+        )
     
     def _ensure_collection_exists(self, vector_size: int = 512):
         """Ensure the collection exists, create if it doesn't"""
         try:
-            collections = self.client.get_collections()
-            collection_names = [collection.name for collection in collections.collections]
-            
-            if self.collection_name not in collection_names:
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=models.VectorParams(
-                        size=vector_size,
-                        distance=models.Distance.COSINE
-                    )
-                )
+            # Existence check by name, rather than listing every collection on the server
+            if not self.client.collection_exists(self.collection_name):
+                self._create_collection(vector_size)
                 logger.info(f"Created collection: {self.collection_name}")
+                return
+            
+            # Check if existing collection has correct vector size
+            collection_info = self.client.get_collection(self.collection_name)
+            existing_size = collection_info.config.params.vectors.size
+            if existing_size != vector_size:
+                logger.warning(f"Collection {self.collection_name} has wrong vector size {existing_size}, expected {vector_size}. Recreating collection...")
+                self.client.delete_collection(self.collection_name)
+                self._create_collection(vector_size)
+                logger.info(f"Recreated collection: {self.collection_name} with correct vector size")
             else:
-                # Check if existing collection has correct vector size
-                collection_info = self.client.get_collection(self.collection_name)
-                existing_size = collection_info.config.params.vectors.size
-                if existing_size != vector_size:
-                    logger.warning(f"Collection {self.collection_name} has wrong vector size {existing_size}, expected {vector_size}. Recreating collection...")
-                    self.client.delete_collection(self.collection_name)
-                    self.client.create_collection(
-                        collection_name=self.collection_name,
-                        vectors_config=models.VectorParams(
-                            size=vector_size,
-                            distance=models.Distance.COSINE
-                        )
-                    )
-                    logger.info(f"Recreated collection: {self.collection_name} with correct vector size")
-                else:
-                    logger.info(f"Using existing collection: {self.collection_name}")
+                logger.info(f"Using existing collection: {self.collection_name}")
+                self._ensure_quantization(collection_info)
                 
         except UnexpectedResponse as e:
             logger.error(f"Error creating Qdrant collection: {e}")
             raise
     
+    def _ensure_quantization(self, collection_info: models.CollectionInfo):
+        """
+        Quantize a collection created before quantization was enabled (Qdrant rebuilds it in the background)
+        
+        Only runs when QDRANT_QUANTIZE_EXISTING is set, so a deploy never changes an
+        existing collection as a side effect.
+        """
+        if not QDRANT_QUANTIZE_EXISTING or collection_info.config.quantization_config is not None:
+            return
+        quantization_config = self._quantization_config()
+        if quantization_config is None:
+            return
+        try:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                quantization_config=quantization_config
+            )
+            logger.info(f"Enabled {QDRANT_QUANTIZATION} quantization on collection: {self.collection_name}")
+        except Exception as e:
+            logger.error(f"Error enabling quantization on {self.collection_name}: {str(e)}")
+    
     def recreate_collection(self, vector_size: int = 512):
         """Recreate the collection with the specified vector size"""
         try:
@@ -78,161 +247,393 @@ class QdrantManager:
                 pass
             
             # Create new collection
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=vector_size,
-                    distance=models.Distance.COSINE
-                )
-            )
+            self._create_collection(vector_size)
             logger.info(f"Created collection: {self.collection_name} with vector size {vector_size}")
             
         except Exception as e:
             logger.error(f"Error recreating collection: {e}")
             raise
     
+    def _category_match_filter(self, category_filter: Optional[str]) -> Optional[models.Filter]:
+        """Exact match on the normalized category, or None"""
+        if not category_filter:
+            return None
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="category_norm",
+                    match=models.MatchValue(value=_normalize_label(category_filter))
+                )
+            ]
+        )
+    
+    def _similar_query(
+        self,
+        query_embedding: Vector,
+        category_filter: Optional[str],
+        limit: int,
+        min_score: float
+    ) -> Dict[str, Any]:
+        """
+        query_points arguments for search_similar: a filtered vector prefetch re-ranked server-side
+        
+        The formula applies the category (x1.1) and jewelry type (x1.2) boosts to the
+        similarity score in Qdrant, over a prefetch window wider than `limit` so boosted
+        hits from just outside the raw top-k can still make the cut.
+        """
+        boosts = [
+            "$score",
+            # Non-empty jewelry_type: 1 + 0.2 * condition (IsEmpty alone lets "" through)
+            models.SumExpression(sum=[1.0, models.MultExpression(mult=[0.2, models.Filter(
+                must_not=[
+                    models.IsEmptyCondition(is_empty=models.PayloadField(key="jewelry_type")),
+                    models.FieldCondition(key="jewelry_type", match=models.MatchValue(value=""))
+                ]
+            )])])
+        ]
+        if category_filter:
+            # Every hit passed the category filter, so the exact-category boost always applies
+            boosts.append(1.1)
+        
+        return {
+            "prefetch": models.Prefetch(
+                query=_as_vector_input(query_embedding),
+                filter=self._category_match_filter(category_filter),
+                limit=limit * 4,
+                score_threshold=min_score,
+                params=_search_params(limit * 4)
+            ),
+            "query": models.FormulaQuery(formula=models.MultExpression(mult=boosts)),
+            "limit": limit,
+            # Vectors are left out by default; no with_vector(s) key, since query_points and
+            # QueryRequest spell it differently
+            "with_payload": RESULT_PAYLOAD_FIELDS
+        }
+    
+    def _format_similar_results(self, search_results, category_filter: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Turn re-ranked points into search_similar result dicts (already in relevance order)
+        
+        Points are scored by the _similar_query formula, so "score" undoes its boosts to
+        report the raw similarity, and "relevance_score" is the boosted score capped at 1.0.
+        """
+        category_boost = 1.1 if category_filter else 1.0
+        return [
+            {
+                # Prefer mongo_id if available
+                "id": hit.payload.get("mongo_id") or str(hit.id),
+                "score": boosted / (category_boost * (1.2 if hit.payload.get("jewelry_type") else 1.0)),
+                "relevance_score": min(1.0, boosted),
+                "payload": hit.payload,
+                # Commonly used payload fields, also at the top level
+                **{field: hit.payload[field] for field in SIMILAR_RESULT_FIELDS if field in hit.payload}
+            }
+            for hit in search_results
+            if hit.payload  # Skip results without required fields
+            for boosted in (float(hit.score) if hit.score is not None else 0.0,)
+        ]
+    
     def search_similar(
         self,
-        query_embedding: List[float],
+        query_embedding: Vector,
         limit: int = 10,
         category_filter: Optional[str] = None,
         min_score: float = 0.0
     ) -> List[Dict[str, Any]]:
         """Search for similar vectors in Qdrant with optional category filtering"""
         try:
-            # Build filter query if category is specified
-            query_filter = None
+            self._ensure_ready()
+            # Create payload index for category if it doesn't exist
             if category_filter:
-                # Create payload index for category if it doesn't exist
-                try:
-                    self.client.create_payload_index(
-                        collection_name=self.collection_name,
-                        field_name="category",
-                        field_schema=models.PayloadSchemaType.KEYWORD
-                    )
-                except Exception:
-                    # Index might already exist, which is fine
-                    pass
-                
-                # Try exact match first, then fallback to case-insensitive match
-                query_filter = models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="category",
-                            match=models.MatchValue(value=category_filter)
-                        )
-                    ]
-                )
+                self._ensure_payload_indexes(["category_norm"])
             
-            # Try search with exact category match first
-            search_results = self.client.search(
+            response = self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_embedding,
-                query_filter=query_filter,
-                limit=limit,
-                score_threshold=min_score
+                **self._similar_query(query_embedding, category_filter, limit, min_score)
             )
             
-            # If no results and category filter is applied, try case-insensitive variations
-            if not search_results and category_filter:
-                # Try different case variations
-                case_variations = [
-                    category_filter.capitalize(),  # rings -> Rings
-                    category_filter.lower(),       # RINGS -> rings
-                    category_filter.upper()        # rings -> RINGS
-                ]
-                
-                for variation in case_variations:
-                    if variation == category_filter:
-                        continue  # Skip if same as original
-                    
-                    alt_filter = models.Filter(
-                        must=[
-                            models.FieldCondition(
-                                key="category",
-                                match=models.MatchValue(value=variation)
-                            )
-                        ]
-                    )
-                    
-                    search_results = self.client.search(
-                        collection_name=self.collection_name,
-                        query_vector=query_embedding,
-                        query_filter=alt_filter,
-                        limit=limit,
-                        score_threshold=min_score
-                    )
-                    
-                    if search_results:
-                        logger.info(f"Found results using case variation: {variation}")
-                        break
-            
-            results = []
-            for hit in search_results:
-                try:
-                    # Skip results without required fields
-                    if not hit.payload:
-                        continue
-                        
-                    # Get product ID, preferring mongo_id if available
-                    product_id = hit.payload.get("mongo_id") or str(hit.id)
-                    if not product_id:
-                        continue
-                    
-                    # Get product's jewelry type if available
-                    product_jewelry_type = hit.payload.get("jewelry_type", "").lower()
-                    
-                    # Calculate base relevance score (inverted distance, higher is better)
-                    # Scale to 0-1 range where 1 is perfect match
-                    relevance_score = float(hit.score) if hit.score is not None else 0.0
-                    
-                    # Boost score for exact matches on important fields
-                    if category_filter and hit.payload.get("category", "").lower() == category_filter.lower():
-                        relevance_score = min(1.0, relevance_score * 1.1)  # 10% boost for exact category match
-                    
-                    # Boost score for exact jewelry type matches
-                    if product_jewelry_type:
-                        relevance_score = min(1.0, relevance_score * 1.2)  # 20% boost for exact jewelry type match
-                    
-                    result = {
-                        "id": product_id,
-                        "score": float(hit.score) if hit.score is not None else 0.0,
-                        "relevance_score": relevance_score,
-                        "payload": hit.payload
-                    }
-                    
-                    # Add any additional fields from payload
-                    for field in ["name", "description", "category", "jewelry_type", "image_url"]:
-                        if field in hit.payload:
-                            result[field] = hit.payload[field]
-                    
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"Error processing search result: {str(e)}", exc_info=True)
-                    continue
+            results = self._format_similar_results(response.points, category_filter)
+            logger.info("Found %d matching products", len(results))
+            return results
             
-            # Sort by relevance score (highest first)
-            results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+        except Exception as e:
+            logger.error(f"Error in search_similar: {str(e)}", exc_info=True)
+            # Return empty list instead of raising to prevent breaking the search
+            return []
+    
+    async def asearch_similar(
+        self,
+        query_embedding: Vector,
+        limit: int = 10,
+        category_filter: Optional[str] = None,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """Async variant of search_similar using the async Qdrant client"""
+        try:
+            await self._aensure_ready()
+            if category_filter:
+                await self._aensure_payload_indexes(["category_norm"])
             
-            # Limit results after all processing
-            results = results[:limit]
+            response = await self.async_client.query_points(
+                collection_name=self.collection_name,
+                **self._similar_query(query_embedding, category_filter, limit, min_score)
+            )
             
-            logger.info(f"Found {len(results)} matching products")
+            results = self._format_similar_results(response.points, category_filter)
+            logger.info("Found %d matching products", len(results))
             return results
             
         except Exception as e:
-            logger.error(f"Error in search_similar: {str(e)}", exc_info=True)
-            # Return empty list instead of raising to prevent breaking the search
+            logger.error(f"Error in asearch_similar: {str(e)}", exc_info=True)
             return []
     
+    def search_similar_batch(
+        self,
+        query_embeddings: List[Vector],
+        limit: int = 10,
+        category_filter: Optional[str] = None,
+        min_score: float = 0.0
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run search_similar for several query vectors in a single round-trip
+        
+        Args:
+            query_embeddings: Query vectors sharing the same category filter
+            limit: Maximum number of results per query
+            category_filter: Optional category to filter results
+            min_score: Minimum similarity score threshold
+        
+        Returns:
+            One search_similar result list per query embedding, in the same order
+        """
+        try:
+            self._ensure_ready()
+            if category_filter:
+                self._ensure_payload_indexes(["category_norm"])
+            
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    models.QueryRequest(**self._similar_query(embedding, category_filter, limit, min_score))
+                    for embedding in query_embeddings
+                ]
+            )
+            
+            return [self._format_similar_results(response.points, category_filter) for response in responses]
+            
+        except Exception as e:
+            logger.error(f"Error in search_similar_batch: {str(e)}", exc_info=True)
+            return [[] for _ in query_embeddings]
+    
+    def _filter_index_fields(
+        self,
+        user_id: Optional[str] = None,
+        category_filter: Optional[str] = None,
+        jewelry_type: Optional[str] = None
+    ) -> List[str]:
+        """Payload fields that need a keyword index for the given filter arguments"""
+        return [
+            field for field, value in (
+                ("created_by", user_id),
+                ("category_norm", category_filter),
+                ("jewelry_type_norm", jewelry_type)
+            ) if value
+        ]
+    
+    def _ensure_payload_indexes(
+        self,
+        fields: List[str],
+        field_schema: models.PayloadSchemaType = models.PayloadSchemaType.KEYWORD
+    ):
+        """Create payload indexes (keyword by default) for the given fields (no-op if they exist)"""
+        for field in fields:
+            if field in self._ensured_indexes:
+                continue
+            self._ensured_indexes.add(field)
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=field_schema
+                )
+                logger.info(f"Created payload index for '{field}' field")
+            except Exception as e:
+                # Index might already exist, which is fine
+                logger.debug(f"Payload index for '{field}' already exists or error: {str(e)}")
+    
+    async def _aensure_payload_indexes(self, fields: List[str]):
+        """Async variant of _ensure_payload_indexes"""
+        for field in fields:
+            if field in self._ensured_indexes:
+                continue
+            self._ensured_indexes.add(field)
+            try:
+                await self.async_client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+                logger.info(f"Created payload index for '{field}' field")
+            except Exception as e:
+                # Index might already exist, which is fine
+                logger.debug(f"Payload index for '{field}' already exists or error: {str(e)}")
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _cached_products_filter(
+        user_id: Optional[str],
+        category_filter: Optional[str],
+        jewelry_type: Optional[str]
+    ) -> Optional[models.Filter]:
+        """Memoized user/category/jewelry type filter; it is shared between calls, so never mutate it"""
+        must_conditions = []
+        
+        # Only filter by user_id if provided, but don't make it required
+        if user_id:
+            must_conditions.append(
+                models.FieldCondition(
+                    key="created_by",
+                    match=models.MatchValue(value=user_id)
+                )
+            )
+        
+        # Category and jewelry type are matched case-insensitively via their normalized fields
+        if category_filter:
+            must_conditions.append(
+                models.FieldCondition(
+                    key="category_norm",
+                    match=models.MatchValue(value=_normalize_label(category_filter))
+                )
+            )
+        
+        if jewelry_type:
+            must_conditions.append(
+                models.FieldCondition(
+                    key="jewelry_type_norm",
+                    match=models.MatchValue(value=_normalize_label(jewelry_type))
+                )
+            )
+        
+        return models.Filter(must=must_conditions) if must_conditions else None
+    
+    def _build_products_filter(
+        self,
+        user_id: Optional[str] = None,
+        category_filter: Optional[str] = None,
+        jewelry_type: Optional[str] = None,
+        candidate_ids: Optional[List[str]] = None
+    ) -> Optional[models.Filter]:
+        """Build the Qdrant filter for user, category, jewelry type and candidate ID constraints"""
+        query_filter = self._cached_products_filter(user_id, category_filter, jewelry_type)
+        logger.debug("Filtering by user_id: %s, category: %s, jewelry type: %s", user_id, category_filter, jewelry_type)
+        
+        # Restrict the dense search to candidates pre-selected by a cheaper keyword search
+        if candidate_ids:
+            candidate_condition = models.FieldCondition(
+                key="mongo_id",
+                match=models.MatchAny(any=candidate_ids)
+            )
+            must_conditions = [*query_filter.must, candidate_condition] if query_filter else [candidate_condition]
+            query_filter = models.Filter(must=must_conditions)
+            logger.debug("Restricting search to %d keyword candidates", len(candidate_ids))
+        
+        return query_filter
+    
+    def _format_product_results(self, search_results) -> List[Dict[str, Any]]:
+        """
+        Format scored points as product dicts (one point per product, so no dedup is needed)
+        
+        The top-level fields are references into the payload, not copies; callers read
+        both shapes, so neither can be dropped.
+        """
+        return [
+            {
+                "product_id": payload.get("mongo_id", str(result.id)),
+                "name": payload.get("name", ""),
+                "category": payload.get("category", ""),
+                "price": payload.get("price", 0.0),
+                "description": payload.get("description", ""),
+                "score": result.score,
+                "image_url": payload.get("image_url", ""),
+                "image_path": payload.get("image_path", ""),
+                "image": payload.get("image", ""),
+                "payload": payload  # Include full payload for backward compatibility
+            }
+            for result in search_results
+            for payload in (result.payload,)
+        ]
+
+    @staticmethod
+    def _search_cache_key(query_embedding: Vector, *search_args) -> tuple:
+        """
+        Cache key for a product search: the query vector's values plus the search arguments
+        
+        Keyed on the input as given (array bytes or a tuple of the list), so a lookup never
+        converts the vector to another form.
+        """
+        if isinstance(query_embedding, np.ndarray):
+            vector_key = query_embedding.tobytes()
+        else:
+            vector_key = tuple(query_embedding)
+        return (vector_key, *search_args)
+
+    def _cached_search(self, cache_key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Copies of the cached products for a search, or None on a miss"""
+        with self._search_cache_lock:
+            cached = self._search_cache.get(cache_key)
+        return None if cached is None else [dict(product) for product in cached]
+
+    def _cache_search(self, cache_key: tuple, products: List[Dict[str, Any]]):
+        """Cache copies of a search's products, so callers can't mutate the cached entry"""
+        entry = tuple(dict(product) for product in products)
+        with self._search_cache_lock:
+            self._search_cache[cache_key] = entry
+
+    def _clear_search_cache(self):
+        """Drop all cached searches after a write"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+
+    def _rescored_query(
+        self,
+        query_embedding: Vector,
+        query_filter: Optional[models.Filter],
+        limit: int,
+        score_threshold: float,
+        hnsw_ef: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        query_points arguments for a two-stage search
+        
+        The filtered prefetch collects limit * 4 candidates from the quantized vectors
+        alone; the outer query rescores just those with the original vectors and
+        applies the score threshold to the exact scores.
+        """
+        query = _as_vector_input(query_embedding)
+        return {
+            "prefetch": models.Prefetch(
+                query=query,
+                filter=query_filter,
+                limit=limit * 4,
+                params=_prefetch_params(limit * 4, hnsw_ef)
+            ),
+            "query": query,
+            "limit": limit,
+            "score_threshold": score_threshold,
+            "search_params": RESCORE_PARAMS,
+            "with_payload": RESULT_PAYLOAD_FIELDS,
+            "with_vectors": False
+        }
+
     def search_similar_products(
         self, 
-        query_embedding: List[float], 
+        query_embedding: Vector, 
         user_id: Optional[str] = None,
         category_filter: Optional[str] = None,
         jewelry_type: Optional[str] = None,
         limit: int = 10,  # Increased default limit
-        min_score: float = 0.05  # Lowered minimum score threshold for better recall
+        min_score: float = 0.05,  # Lowered minimum score threshold for better recall
+        hnsw_ef: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar products using vector similarity with user filtering
@@ -244,341 +645,377 @@ class QdrantManager:
             jewelry_type: Optional jewelry type to filter by (e.g., 'ring', 'necklace')
             limit: Maximum number of results
             min_score: Minimum similarity score threshold
+            hnsw_ef: Optional HNSW search breadth; defaults to max(64, limit * 4)
             
         Returns:
             List of similar products with scores
         """
+        cache_key = self._search_cache_key(
+            query_embedding, user_id, category_filter, jewelry_type, limit, min_score, hnsw_ef
+        )
+        cached = self._cached_search(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Build filter for user-specific and category search
-            query_filter = None
-            filter_conditions = []
-            category_should_conditions = []
-            jewelry_type_conditions = []
-            
-            # Only filter by user_id if provided, but don't make it required
-            if user_id:
-                try:
-                    # Check if created_by index exists, create if not
-                    try:
-                        self.client.create_payload_index(
-                            collection_name=self.collection_name,
-                            field_name="created_by",
-                            field_schema=models.PayloadSchemaType.KEYWORD
-                        )
-                        logger.info(f"Created payload index for 'created_by' field")
-                    except Exception as e:
-                        # Index might already exist, which is fine
-                        logger.debug(f"Payload index for 'created_by' already exists or error: {str(e)}")
-                    
-                    filter_conditions.append(
-                        models.FieldCondition(
-                            key="created_by",
-                            match=models.MatchValue(value=user_id)
-                        )
-                    )
-                    logger.info(f"Filtering by user_id: {user_id}")
-                except Exception as e:
-                    logger.warning(f"Error filtering by user_id: {str(e)} - falling back to all users")
-                    # Continue without user filter if there's an error
+            self._ensure_ready()
+            self._ensure_payload_indexes(self._filter_index_fields(user_id, category_filter, jewelry_type))
+            query_filter = self._build_products_filter(user_id, category_filter, jewelry_type)
             
-            if category_filter:
-                try:
-                    # Try to create payload index for category (will fail if exists, which is fine)
-                    try:
-                        self.client.create_payload_index(
-                            collection_name=self.collection_name,
-                            field_name="category",
-                            field_schema=models.PayloadSchemaType.KEYWORD
-                        )
-                        logger.info(f"Created payload index for 'category' field")
-                    except Exception as e:
-                        logger.debug(f"Payload index for 'category' already exists or error: {str(e)}")
-                    
-                    # Add category filter - try exact match first, then case variations
-                    category_variations = [
-                        category_filter,                    # Original
-                        category_filter.lower(),          # lowercase
-                        category_filter.capitalize(),     # Capitalized
-                        category_filter.upper()           # UPPERCASE
-                    ]
-                    
-                    # Use Should condition to match any of the variations
-                    category_conditions = []
-                    for variation in category_variations:
-                        category_conditions.append(
-                            models.FieldCondition(
-                                key="category",
-                                match=models.MatchValue(value=variation)
-                            )
-                        )
-                    
-                    # Store category conditions for later combination
-                    category_should_conditions = category_conditions
-                    logger.info(f"Filtering by category: {category_filter}")
-                except Exception as e:
-                    logger.warning(f"Error filtering by category: {str(e)} - falling back to all categories")
-                    # Continue without category filter if there's an error
-            
-            # Add jewelry type filter if specified
-            if jewelry_type:
-                try:
-                    # Create payload index for jewelry_type if it doesn't exist
-                    try:
-                        self.client.create_payload_index(
-                            collection_name=self.collection_name,
-                            field_name="jewelry_type",
-                            field_schema=models.PayloadSchemaType.KEYWORD
-                        )
-                        logger.info("Created payload index for 'jewelry_type' field")
-                    except Exception as e:
-                        logger.debug(f"Payload index for 'jewelry_type' already exists or error: {str(e)}")
-                    
-                    # Add jewelry type filter - try exact match first, then case variations
-                    jewelry_variations = [
-                        jewelry_type,                    # Original
-                        jewelry_type.lower(),           # lowercase
-                        jewelry_type.capitalize(),      # Capitalized
-                        jewelry_type.upper()            # UPPERCASE
-                    ]
-                    
-                    # Add jewelry type conditions
-                    for variation in jewelry_variations:
-                        jewelry_type_conditions.append(
-                            models.FieldCondition(
-                                key="jewelry_type",
-                                match=models.MatchValue(value=variation)
-                            )
-                        )
-                    
-                    logger.info(f"Filtering by jewelry type: {jewelry_type}")
-                except Exception as e:
-                    logger.warning(f"Error filtering by jewelry type: {str(e)} - falling back to all types")
+            # Log search parameters
+            logger.debug("Searching with params: limit=%s, min_score=%s, filters=%s", limit, min_score, query_filter)
             
-            # Build final filter combining must and should conditions
-            if filter_conditions or category_should_conditions or jewelry_type_conditions:
-                all_must_conditions = []
-                
-                # Add user_id filter conditions if they exist
-                if filter_conditions:
-                    all_must_conditions.extend(filter_conditions)
-                
-                # Add category filter conditions if they exist
-                if category_should_conditions:
-                    # For category, we need to use should conditions within a must clause
-                    # to match any of the category variations
-                    category_values = [condition.match.value for condition in category_should_conditions]
-                    all_must_conditions.append(
-                        models.FieldCondition(
-                            key="category",
-                            match=models.MatchAny(any=category_values)
-                        )
-                    )
-                
-                # Add jewelry type conditions if they exist
-                if jewelry_type_conditions:
-                    # For jewelry_type, we need to use should conditions within a must clause
-                    # to match any of the jewelry type variations
-                    jewelry_values = [condition.match.value for condition in jewelry_type_conditions]
-                    all_must_conditions.append(
-                        models.FieldCondition(
-                            key="jewelry_type",
-                            match=models.MatchAny(any=jewelry_values)
-                        )
-                    )
-                
-                query_filter = models.Filter(must=all_must_conditions)
-            else:
-                query_filter = None
+            # One round-trip; callers that want a looser search retry with their own threshold
+            search_results = self.client.query_points(
+                collection_name=self.collection_name,
+                **self._rescored_query(query_embedding, query_filter, limit, min_score, hnsw_ef)
+            ).points
             
-            # Log search parameters
-            logger.info(f"Searching with params: limit={limit}, min_score={min_score}, filters={query_filter}")
+            products = self._format_product_results(search_results)
+            self._cache_search(cache_key, products)
             
-            try:
-                # Always honor user isolation when user_id is provided.
-                search_results = self.client.search(
-                    collection_name=self.collection_name,
-                    query_vector=query_embedding,
-                    query_filter=query_filter,
-                    limit=limit,
-                    score_threshold=min_score,
-                    with_payload=True,
-                    with_vectors=False
-                )
+            logger.info("Found %d unique similar products for user %s", len(products), user_id)
+            return products
+        
+        except Exception as e:
+            logger.error(f"Error searching products: {str(e)}")
+            return []
 
-                # If no results and a user_id is provided, relax only the score threshold but keep the user filter.
-                if user_id and not search_results:
-                    logger.info("No results; retrying with relaxed threshold while keeping user filter")
-                    relaxed_must_conditions = [
-                        models.FieldCondition(
-                            key="created_by",
-                            match=models.MatchValue(value=user_id)
-                        )
-                    ]
-                    # Keep category/jewelry constraints if they existed originally
-                    if category_filter:
-                        category_values = [category_filter, category_filter.lower(), category_filter.capitalize(), category_filter.upper()]
-                        relaxed_must_conditions.append(
-                            models.FieldCondition(
-                                key="category",
-                                match=models.MatchAny(any=category_values)
-                            )
-                        )
-                    if jewelry_type:
-                        jewelry_values = [jewelry_type, jewelry_type.lower(), jewelry_type.capitalize(), jewelry_type.upper()]
-                        relaxed_must_conditions.append(
-                            models.FieldCondition(
-                                key="jewelry_type",
-                                match=models.MatchAny(any=jewelry_values)
-                            )
-                        )
-                    relaxed_filter = models.Filter(must=relaxed_must_conditions)
-                    search_results = self.client.search(
-                        collection_name=self.collection_name,
-                        query_vector=query_embedding,
-                        query_filter=relaxed_filter,
-                        limit=limit,
-                        score_threshold=min_score * 0.5,
-                        with_payload=True,
-                        with_vectors=False
-                    )
-            except Exception as e:
-                logger.error(f"Error during search: {str(e)}")
-                # Return empty results instead of falling back to unfiltered search
-                search_results = []
+    async def asearch_similar_products(
+        self, 
+        query_embedding: Vector, 
+        user_id: Optional[str] = None,
+        category_filter: Optional[str] = None,
+        jewelry_type: Optional[str] = None,
+        limit: int = 10,
+        min_score: float = 0.05,
+        candidate_ids: Optional[List[str]] = None,
+        hnsw_ef: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of search_similar_products backed by AsyncQdrantClient
+        
+        candidate_ids optionally restricts the search to these MongoDB IDs (e.g. keyword
+        matches); retrying without them on a miss is left to the caller.
+        """
+        cache_key = self._search_cache_key(
+            query_embedding, user_id, category_filter, jewelry_type, limit, min_score, hnsw_ef,
+            tuple(candidate_ids) if candidate_ids is not None else None
+        )
+        cached = self._cached_search(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            await self._aensure_ready()
+            await self._aensure_payload_indexes(self._filter_index_fields(user_id, category_filter, jewelry_type))
+            query_filter = self._build_products_filter(user_id, category_filter, jewelry_type, candidate_ids)
             
-            # If no results and category filter is applied, try case-insensitive variations
-            if not search_results and category_filter:
-                # Try different case variations
-                case_variations = [
-                    category_filter.capitalize(),  # laptops -> Laptops
-                    category_filter.lower(),       # Laptops -> laptops
-                    category_filter.upper()        # laptops -> LAPTOPS
-                ]
-                
-                for variation in case_variations:
-                    if variation == category_filter:
-                        continue  # Skip if same as original
-                    
-                    # Build alternative filter with case variation
-                    alt_filter_conditions = []
-                    
-                    if user_id:
-                        alt_filter_conditions.append(
-                            models.FieldCondition(
-                                key="created_by",
-                                match=models.MatchValue(value=user_id)
-                            )
-                        )
-                    
-                    alt_filter_conditions.append(
-                        models.FieldCondition(
-                            key="category",
-                            match=models.MatchValue(value=variation)
-                        )
-                    )
-                    
-                    alt_filter = models.Filter(must=alt_filter_conditions)
-                    
-                    # Try search with case variation
-                    search_results = self.client.search(
-                        collection_name=self.collection_name,
-                        query_vector=query_embedding,
-                        query_filter=alt_filter,
-                        limit=limit,
-                        score_threshold=min_score,
-                        with_payload=True,
-                        with_vectors=False
-                    )
-                    
-                    if search_results:
-                        logger.info(f"Found results using case variation: {variation}")
-                        break
+            logger.debug("Searching with params: limit=%s, min_score=%s, filters=%s", limit, min_score, query_filter)
             
-            # Format results and remove duplicates
-            products = []
-            seen_product_ids = set()  # Track seen product IDs to avoid duplicates
+            search_results = (await self.async_client.query_points(
+                collection_name=self.collection_name,
+                **self._rescored_query(query_embedding, query_filter, limit, min_score, hnsw_ef)
+            )).points
             
-            for result in search_results:
-                product_id = result.payload.get("mongo_id", str(result.id))
-                
-                # Skip if we've already seen this product
-                if product_id in seen_product_ids:
-                    continue
-                    
-                product = {
-                    "product_id": product_id,
-                    "name": result.payload.get("name", ""),
-                    "category": result.payload.get("category", ""),
-                    "price": result.payload.get("price", 0.0),
-                    "description": result.payload.get("description", ""),
-                    "score": result.score,
-                    "image_url": result.payload.get("image_url", ""),
-                    "image_path": result.payload.get("image_path", ""),
-                    "image": result.payload.get("image", ""),
-                    "payload": result.payload  # Include full payload for backward compatibility
-                }
-                
-                products.append(product)
-                seen_product_ids.add(product_id)  # Mark this product ID as seen
+            products = self._format_product_results(search_results)
+            self._cache_search(cache_key, products)
             
-            logger.info(f"Found {len(products)} unique similar products for user {user_id}")
+            logger.info("Found %d unique similar products for user %s", len(products), user_id)
             return products
         
         except Exception as e:
             logger.error(f"Error searching products: {str(e)}")
             return []
+
+    def _batch_requests(
+        self,
+        query_embeddings: List[Vector],
+        query_filter: Optional[models.Filter],
+        limit: int,
+        min_score: float,
+        hnsw_ef: Optional[int] = None
+    ) -> List[models.QueryRequest]:
+        """
+        One QueryRequest per embedding, all sharing the same filter
+        
+        Each request is the same two-stage search as _rescored_query, so batched and
+        single searches score products identically.
+        """
+        return [
+            models.QueryRequest(
+                prefetch=models.Prefetch(
+                    query=query,
+                    filter=query_filter,
+                    limit=limit * 4,
+                    params=_prefetch_params(limit * 4, hnsw_ef)
+                ),
+                query=query,
+                limit=limit,
+                score_threshold=min_score,
+                params=RESCORE_PARAMS,
+                with_payload=RESULT_PAYLOAD_FIELDS,
+                with_vector=False
+            )
+            for query in map(_as_vector_input, query_embeddings)
+        ]
+
+    def search_batch(
+        self,
+        query_embeddings: List[Vector],
+        user_id: Optional[str] = None,
+        category_filter: Optional[str] = None,
+        jewelry_type: Optional[str] = None,
+        limit: int = 10,
+        min_score: float = 0.05,
+        hnsw_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run several similarity searches sharing one filter in a single round-trip
+
+        Args:
+            query_embeddings: Query vectors, e.g. one per modality
+            user_id: Optional user ID to filter results (username)
+            category_filter: Optional category to filter results
+            jewelry_type: Optional jewelry type to filter by
+            limit: Maximum number of results per query
+            min_score: Minimum similarity score threshold
+            hnsw_ef: Optional HNSW search breadth; defaults to max(64, limit * 4)
+
+        Returns:
+            One list of products per query embedding, in the same order
+        """
+        try:
+            self._ensure_ready()
+            self._ensure_payload_indexes(self._filter_index_fields(user_id, category_filter, jewelry_type))
+            query_filter = self._build_products_filter(user_id, category_filter, jewelry_type)
+
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=self._batch_requests(query_embeddings, query_filter, limit, min_score, hnsw_ef)
+            )
+
+            return [self._format_product_results(response.points) for response in responses]
+
+        except Exception as e:
+            logger.error(f"Error in batch product search: {str(e)}")
+            return [[] for _ in query_embeddings]
+
+    async def asearch_batch(
+        self,
+        query_embeddings: List[Vector],
+        user_id: Optional[str] = None,
+        category_filter: Optional[str] = None,
+        jewelry_type: Optional[str] = None,
+        limit: int = 10,
+        min_score: float = 0.05,
+        hnsw_ef: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Async variant of search_batch backed by AsyncQdrantClient"""
+        try:
+            await self._aensure_ready()
+            await self._aensure_payload_indexes(self._filter_index_fields(user_id, category_filter, jewelry_type))
+            query_filter = self._build_products_filter(user_id, category_filter, jewelry_type)
+
+            responses = await self.async_client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=self._batch_requests(query_embeddings, query_filter, limit, min_score, hnsw_ef)
+            )
+
+            return [self._format_product_results(response.points) for response in responses]
+
+        except Exception as e:
+            logger.error(f"Error in batch product search: {str(e)}")
+            return [[] for _ in query_embeddings]
+
+    @staticmethod
+    def _point_id(product_id: str) -> str:
+        """Deterministic UUID point ID for a MongoDB ObjectId string (searches resolve via payload mongo_id)"""
+        return str(uuid.uuid5(uuid.NAMESPACE_OID, product_id))
+    
+    @staticmethod
+    def _point_payload(product_id: str, category: Optional[str] = None, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Prepare payload with original MongoDB ID, category and normalized filter fields"""
+        payload = metadata or {}
+        payload["mongo_id"] = product_id
+        if category:
+            payload["category"] = category
+        payload.update(QdrantManager._normalized_fields(payload))
+        return payload
+    
+    @staticmethod
+    def _normalized_fields(payload: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Lowercased copies of category and jewelry_type for case-insensitive exact filters
+        
+        The original values are kept as-is for display.
+        """
+        return {
+            f"{field}_norm": _normalize_label(payload[field])
+            for field in ("category", "jewelry_type")
+            if isinstance(payload.get(field), str) and payload[field]
+        }
+    
+    def backfill_normalized_payload(self, batch_size: int = 256) -> int:
+        """
+        Add the normalized filter fields to points stored before they existed
+        
+        Only points that have a category or jewelry type but lack its normalized copy are
+        touched, so once everything is migrated this is a single empty scroll.
+        
+        Returns:
+            Number of points updated
+        """
+        missing_norm = models.Filter(
+            should=[
+                models.Filter(
+                    must=[models.IsEmptyCondition(is_empty=models.PayloadField(key=f"{field}_norm"))],
+                    must_not=[models.IsEmptyCondition(is_empty=models.PayloadField(key=field))]
+                )
+                for field in ("category", "jewelry_type")
+            ]
+        )
+        updated = 0
+        try:
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=missing_norm,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=models.PayloadSelectorInclude(include=["category", "jewelry_type"]),
+                    with_vectors=False
+                )
+                operations = [
+                    models.SetPayloadOperation(
+                        set_payload=models.SetPayload(payload=normalized, points=[point.id])
+                    )
+                    for point in points
+                    for normalized in (self._normalized_fields(point.payload or {}),)
+                    if normalized
+                ]
+                if operations:
+                    self.client.batch_update_points(
+                        collection_name=self.collection_name,
+                        update_operations=operations
+                    )
+                    updated += len(operations)
+                if offset is None:
+                    break
+            if updated:
+                logger.info(f"Backfilled normalized category/jewelry type on {updated} points")
+        except Exception as e:
+            logger.error(f"Error backfilling normalized payload fields: {str(e)}")
+        return updated
     
+    def _build_point(
+        self,
+        product_id: str,
+        text_embedding: Vector,
+        image_embedding: Optional[Vector] = None,
+        category: Optional[str] = None,
+        metadata: Dict[str, Any] = None
+    ) -> models.PointStruct:
+        """Build the Qdrant point for a product, combining text and image embeddings if both exist"""
+        # Use text embedding as primary vector, or combine with image if available
+        vector = np.array(text_embedding, dtype=np.float32)  # Copy: normalized in place below
+        if image_embedding is not None and len(image_embedding) and vector.size:
+            # Combine text and image embeddings (weighted average), in place on the copy
+            vector *= 0.7
+            vector += 0.3 * np.asarray(image_embedding, dtype=np.float32)
+        
+        # Unit length, as DOT-distance collections expect
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        
+        return models.PointStruct(
+            id=self._point_id(product_id),
+            vector=vector.tolist(),
+            payload=self._point_payload(product_id, category, metadata)
+        )
+
     def upsert_product(
         self,
         product_id: str,
-        text_embedding: List[float],
-        image_embedding: Optional[List[float]] = None,
+        text_embedding: Vector,
+        image_embedding: Optional[Vector] = None,
         category: Optional[str] = None,
         metadata: Dict[str, Any] = None
     ) -> bool:
         """Upsert product vector into Qdrant with optional image embedding"""
         try:
-            # Convert MongoDB ObjectId string to integer hash for Qdrant point ID
-            import hashlib
-            point_id = int(hashlib.md5(product_id.encode()).hexdigest(), 16) % (10**18)
-            
-            # Prepare payload with original MongoDB ID and category
-            payload = metadata or {}
-            payload["mongo_id"] = product_id
-            if category:
-                payload["category"] = category
-            
-            # Use text embedding as primary vector, or combine with image if available
-            if image_embedding and text_embedding:
-                # Combine text and image embeddings (weighted average)
-                combined_vector = [
-                    0.7 * t + 0.3 * i 
-                    for t, i in zip(text_embedding, image_embedding)
-                ]
-                vector = combined_vector
-            else:
-                vector = text_embedding
-            
-            # Create point
-            point = models.PointStruct(
-                id=point_id,
-                vector=vector,
-                payload=payload
-            )
+            self._ensure_ready()
+            point = self._build_point(product_id, text_embedding, image_embedding, category, metadata)
             
             # Upsert the point
             operation_info = self.client.upsert(
                 collection_name=self.collection_name,
                 points=[point]
             )
+            self._clear_search_cache()
             
-            logger.info(f"Product upserted successfully: {product_id} (category: {category})")
+            logger.info("Product upserted successfully: %s (category: %s)", product_id, category)
             return True
             
         except Exception as e:
             logger.error(f"Error upserting product {product_id}: {str(e)}")
             return False
 
+    def upsert_products_batch(self, products: List[Dict[str, Any]]) -> bool:
+        """
+        Upsert many product vectors in requests of UPSERT_CHUNK_SIZE points
+        
+        Args:
+            products: Dicts with the upsert_product arguments (product_id, text_embedding,
+                and optionally image_embedding, category, metadata)
+            
+        Returns:
+            True if the batch was accepted by Qdrant
+        """
+        if not products:
+            return True
+        try:
+            self._ensure_ready()
+            # Fuse and normalize the whole batch as one (N, dim) matrix, same math as _build_point
+            vectors = np.asarray([product["text_embedding"] for product in products], dtype=np.float32)
+            fused_rows = [
+                i for i, product in enumerate(products)
+                if product.get("image_embedding") is not None and len(product["image_embedding"])
+            ]
+            if fused_rows:
+                image_vectors = np.asarray([products[i]["image_embedding"] for i in fused_rows], dtype=np.float32)
+                vectors[fused_rows] = 0.7 * vectors[fused_rows] + 0.3 * image_vectors
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            
+            for start in range(0, len(products), UPSERT_CHUNK_SIZE):
+                chunk = products[start:start + UPSERT_CHUNK_SIZE]
+                # Column-oriented batch: one ids/vectors/payloads list each instead of N point objects
+                batch = models.Batch(
+                    ids=[self._point_id(product["product_id"]) for product in chunk],
+                    vectors=vectors[start:start + UPSERT_CHUNK_SIZE].tolist(),
+                    payloads=[
+                        self._point_payload(product["product_id"], product.get("category"), product.get("metadata"))
+                        for product in chunk
+                    ]
+                )
+                
+                # Only the last chunk waits: updates apply in order, so once it is applied every
+                # earlier chunk is searchable too
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                    wait=start + UPSERT_CHUNK_SIZE >= len(products)
+                )
+            # Cleared only after the update is applied, so a concurrent search can't re-cache
+            # results that miss the new products
+            self._clear_search_cache()
+            
+            logger.info(f"Upserted batch of {len(products)} products")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error upserting batch of {len(products)} products: {str(e)}")
+            return False
 
 # Initialize a global instance
 qdrant_manager = QdrantManager()
@@ -0,0 +1,21 @@
+import io
+import unittest
+
+from upload_products_json import count_products
+
+
+class CountProductsTest(unittest.TestCase):
+    def test_counts_object_products(self):
+        data = b'[{"name": "Ring", "price": 10}, {"name": "Necklace", "category": "jewelry"}]'
+        self.assertEqual(count_products(io.BytesIO(data)), 2)
+
+    def test_counts_mixed_items(self):
+        data = b'[{"name": "Ring"}, [1, 2], "x", 3, null, {}]'
+        self.assertEqual(count_products(io.BytesIO(data)), 6)
+
+    def test_non_list_returns_none(self):
+        self.assertIsNone(count_products(io.BytesIO(b'{"name": "Ring"}')))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,20 +5,21 @@ Usage: python upload_products_json.py --file sample_jewelry.json
 """
 
 import requests
-import json
+import ijson
 import argparse
 import os
 
-def login(username, password):
-    """Login and get access token"""
+def login(session, username, password):
+    """Login, get an access token and attach it to the session"""
     try:
-        response = requests.post(
+        response = session.post(
             "http://localhost:8000/auth/login",
             json={"username": username, "password": password}
         )
         if response.status_code == 200:
             data = response.json()
             print(f"✓ Login successful as {username}")
+            session.headers["Authorization"] = f"Bearer {data['access_token']}"
             return data["access_token"]
         else:
             print(f"✗ Login failed: {response.status_code} - {response.text}")
@@ -27,30 +28,36 @@ def login(username, password):
         print(f"✗ Login error: {str(e)}")
         return None
 
-def upload_products_from_json(json_file_path, access_token):
-    """Upload products from JSON file"""
+def count_products(f):
+    """Count the items of a top-level JSON list by streaming it, without loading the products"""
+    events = ijson.parse(f)
+    _, event, _ = next(events, (None, None, None))
+    if event != 'start_array':
+        return None
+    # Each item opens with exactly one start_map/start_array or scalar event at the "item" prefix;
+    # map_key events for an object's keys share that prefix and must not be counted
+    return sum(1 for prefix, event, _ in events if prefix == 'item' and event not in ('map_key', 'end_map', 'end_array'))
+
+def upload_products_from_json(session, json_file_path):
+    """Upload products from JSON file using an authenticated session"""
     try:
-        # Read the JSON file
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-        
-        print(f"✓ Found {len(products)} products in {json_file_path}")
-        
-        # Validate that we have a list of products
-        if not isinstance(products, list):
-            print("✗ JSON file must contain a list of products")
-            return False
-        
-        # Upload the file
         with open(json_file_path, 'rb') as f:
+            # Validate that we have a list of products, streaming rather than parsing it all
+            product_count = count_products(f)
+            if product_count is None:
+                print("✗ JSON file must contain a list of products")
+                return False
+            
+            print(f"✓ Found {product_count} products in {json_file_path}")
+            
+            # Upload the same handle from the start
+            f.seek(0)
             files = {'file': (os.path.basename(json_file_path), f, 'application/json')}
-            headers = {'Authorization': f'Bearer {access_token}'}
             
             print("📤 Uploading products...")
-            response = requests.post(
+            response = session.post(
                 "http://localhost:8000/products/upload",
-                files=files,
-                headers=headers
+                files=files
             )
         
         if response.status_code == 200:
@@ -65,7 +72,7 @@ def upload_products_from_json(json_file_path, access_token):
     except FileNotFoundError:
         print(f"✗ File not found: {json_file_path}")
         return False
-    except json.JSONDecodeError as e:
+    except ijson.JSONError as e:
         print(f"✗ Invalid JSON file: {str(e)}")
         return False
     except Exception as e:
@@ -82,15 +89,18 @@ def main():
     
     print(f"🚀 Starting bulk product upload from {args.file}")
     
+    # One keep-alive connection for login and upload
+    session = requests.Session()
+    
     # Step 1: Login
     print("\n🔐 Step 1: Authenticating...")
-    access_token = login(args.username, args.password)
+    access_token = login(session, args.username, args.password)
     if not access_token:
         return
     
     # Step 2: Upload products
     print("\n📦 Step 2: Uploading products...")
-    success = upload_products_from_json(args.file, access_token)
+    success = upload_products_from_json(session, args.file)
     
     if success:
         print(f"\n✅ Bulk upload completed successfully!")